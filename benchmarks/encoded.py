@@ -0,0 +1,66 @@
+"""Compare encoding a rendered query per call with sql_bytes.
+
+Drivers encode the query str to UTF-8 on every execute, whereas
+sql_bytes encodes it once per shape and dialect. Reports the time per
+render and the bytes allocated for the encoded queries of a number of
+renders. Usage: python benchmarks/encoded.py [--kilobytes 20] [--renders 1000]
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+from typing import Callable
+
+from sql_tstring import sql, sql_bytes
+
+
+def _query(kilobytes: int) -> tuple[str, dict[str, int]]:
+    conditions = []
+    length = 0
+    while length < kilobytes * 1024:
+        condition = f"report_column_{len(conditions)} = {{c{len(conditions)}}}"
+        conditions.append(condition)
+        length += len(condition)
+    query = "SELECT id FROM reports WHERE " + " AND ".join(conditions)
+    return query, {f"c{index}": index for index in range(len(conditions))}
+
+
+def _measure(render: Callable[[], bytes], renders: int) -> tuple[float, int]:
+    start = time.perf_counter()
+    for _ in range(renders):
+        render()
+    duration = (time.perf_counter() - start) / renders
+
+    # Distinct encoded queries, as each is a separate allocation
+    results = [render() for _ in range(renders)]
+    allocated = sum({id(result): len(result) for result in results}.values())
+    return duration, allocated
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--kilobytes", type=int, default=20)
+    parser.add_argument("--renders", type=int, default=1000)
+    args = parser.parse_args()
+
+    query, values = _query(args.kilobytes)
+
+    def _encode() -> bytes:
+        result, _ = sql(query, values)
+        return result.encode()
+
+    def _cached() -> bytes:
+        result, _ = sql_bytes(query, values)
+        return result
+
+    print(f"{len(_cached()) / 1024:.1f} KB query, {args.renders} renders")
+    for name, render in (("sql + encode", _encode), ("sql_bytes", _cached)):
+        duration, allocated = _measure(render, args.renders)
+        print(
+            f"{name:>14}: {duration * 1e6:8.1f} us, {allocated / 1024:10.1f} KB of encoded queries"
+        )
+
+
+if __name__ == "__main__":
+    main()
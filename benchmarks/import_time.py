@@ -0,0 +1,45 @@
+"""Report the cost of ``import sql_tstring`` as measured by ``python -X importtime``.
+
+Usage: python benchmarks/import_time.py [--runs N]
+"""
+
+from __future__ import annotations
+
+import argparse
+import statistics
+import subprocess
+import sys
+
+
+def measure(module: str) -> tuple[int, int]:
+    output = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        check=True,
+        text=True,
+    ).stderr
+    cumulative = 0
+    count = 0
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, raw_cumulative, name = line.split("|")
+        count += 1
+        if name.strip() == module:
+            cumulative = int(raw_cumulative)
+    return cumulative, count
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    results = [measure("sql_tstring") for _ in range(args.runs)]
+    timings = [cumulative for cumulative, _ in results]
+    print(f"import sql_tstring: median {statistics.median(timings)}us, min {min(timings)}us")
+    print(f"modules imported (including interpreter startup): {results[0][1]}")
+
+
+if __name__ == "__main__":
+    main()
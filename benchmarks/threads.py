@@ -0,0 +1,61 @@
+"""Report sql rendering throughput from 1 to N threads.
+
+Run with both a GIL and a free-threaded (e.g. 3.14t) build to compare
+scaling. Usage: python benchmarks/threads.py [--max-threads 16] [--renders 20000]
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from sql_tstring import Absent, sql, sql_context
+
+QUERIES = [
+    "SELECT a, b FROM tbl WHERE a = {a} AND b = {b} ORDER BY {c} LIMIT {d}",
+    "UPDATE tbl SET a = {a}, b = {b} WHERE c = {c} AND d = {d}",
+    "INSERT INTO tbl (a, b, c, d) VALUES ({a}, {b}, {c}, {d})",
+]
+
+
+def _render(renders: int) -> None:
+    with sql_context(columns={"a", "b"}):
+        for index in range(renders):
+            values = {"a": index, "b": Absent if index % 2 else index, "c": "a", "d": 10}
+            sql(QUERIES[index % len(QUERIES)], values)
+
+
+def _throughput(threads: int, renders: int) -> float:
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        start = time.perf_counter()
+        futures = [executor.submit(_render, renders) for _ in range(threads)]
+        for future in futures:
+            future.result()
+        duration = time.perf_counter() - start
+    return threads * renders / duration
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--max-threads", type=int, default=16)
+    parser.add_argument("--renders", type=int, default=20000)
+    args = parser.parse_args()
+
+    gil_enabled = getattr(sys, "_is_gil_enabled", lambda: True)()
+    print(f"Python {sys.version.split()[0]}, GIL {'enabled' if gil_enabled else 'disabled'}")
+    _render(100)  # Warm the shape cache
+
+    base = None
+    threads = 1
+    while threads <= args.max_threads:
+        throughput = _throughput(threads, args.renders)
+        if base is None:
+            base = throughput
+        print(f"{threads:>3} threads: {throughput:>10.0f} renders/s ({throughput / base:.2f}x)")
+        threads *= 2
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,19 @@
 from __future__ import annotations
 
+import sys
 import typing
 from contextvars import ContextVar
-from copy import deepcopy
-from dataclasses import dataclass, field, replace
 from enum import auto, Enum, unique
-from numbers import Number
+from time import perf_counter
 from types import TracebackType
 
+from sql_tstring import observers as _observers
+from sql_tstring.adapters import Adapters
+from sql_tstring.budget import approximate_bytes
+from sql_tstring.cache import shape_cache, ShapeCache
+from sql_tstring.dialects import Dialect, DialectName, get_dialect, Parameters, QMARK
+from sql_tstring.limits import count_values, Limits
+from sql_tstring.observers import Observer, RenderEvent
 from sql_tstring.parser import (
     Clause,
     Element,
@@ -17,12 +23,18 @@ from sql_tstring.parser import (
     Group,
     Literal,
     Operator,
-    parse,
     Part,
     Placeholder,
     PlaceholderType,
+    QueryKind,
+    row_columns,
+    Shape,
+    ShapeKey,
     Statement,
+    template_key,
+    Variant,
 )
+from sql_tstring.predicates import Predicate  # noqa: F401
 from sql_tstring.t import t, Template as TTemplate
 
 try:
@@ -51,12 +63,39 @@ IsNull = RewritingValue.IS_NULL
 IsNotNull = RewritingValue.IS_NOT_NULL
 
 
-@dataclass
 class Context:
-    allow_numeric: bool = False
-    columns: set[str] = field(default_factory=set)
-    dialect: typing.Literal["asyncpg", "sql"] = "sql"
-    tables: set[str] = field(default_factory=set)
+    __slots__ = ("adapters", "allow_numeric", "columns", "dialect", "limits", "observers", "tables")
+
+    def __init__(
+        self,
+        allow_numeric: bool = False,
+        columns: set[str] | None = None,
+        dialect: DialectName | Dialect = "sql",
+        tables: set[str] | None = None,
+        *,
+        adapters: Adapters | None = None,
+        limits: Limits | None = None,
+        observers: tuple[Observer, ...] = (),
+    ) -> None:
+        self.adapters = adapters
+        self.allow_numeric = allow_numeric
+        self.columns = columns if columns is not None else set()
+        self.dialect = dialect
+        self.limits = limits
+        self.observers = observers
+        self.tables = tables if tables is not None else set()
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Context):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"Context({fields})"
+
+    def replace(self, **changes: typing.Any) -> Context:
+        return Context(**({name: getattr(self, name) for name in self.__slots__} | changes))
 
 
 _context_var: ContextVar[Context] = ContextVar("sql_tstring_context")
@@ -77,19 +116,28 @@ def set_context(context: Context) -> None:
 
 def sql_context(
     columns: set[typing.LiteralString] | None = None,
-    dialect: typing.Literal["asyncpg", "sql"] | None = None,
+    dialect: DialectName | Dialect | None = None,
     tables: set[typing.LiteralString] | None = None,
     *,
+    adapters: Adapters | None = None,
     allow_numeric: bool | None = None,
+    limits: Limits | None = None,
+    observers: tuple[Observer, ...] | None = None,
 ) -> _ContextManager:
     ctx = get_context()
     ctx_manager = _ContextManager(ctx)
+    if adapters is not None:
+        ctx_manager._context.adapters = adapters
     if allow_numeric is not None:
         ctx_manager._context.allow_numeric = allow_numeric
     if columns is not None:
         ctx_manager._context.columns = columns
     if dialect is not None:
         ctx_manager._context.dialect = dialect
+    if limits is not None:
+        ctx_manager._context.limits = limits
+    if observers is not None:
+        ctx_manager._context.observers = observers
     if tables is not None:
         ctx_manager._context.tables = tables
     return ctx_manager
@@ -97,31 +145,248 @@ def sql_context(
 
 def sql(
     query_or_template: str | Template | TTemplate, values: dict[str, typing.Any] | None = None
-) -> tuple[str, list]:
-    template: Template | TTemplate
+) -> tuple[str, Parameters]:
+    _, _, result_str, result_values = _sql(_to_template(query_or_template, values))
+    return result_str, result_values
+
+
+def sql_bytes(
+    query_or_template: str | Template | TTemplate, values: dict[str, typing.Any] | None = None
+) -> tuple[bytes, Parameters]:
+    # The query encoded as UTF-8, which for shapes with only variable
+    # placeholders is encoded once per dialect and then reused.
+    shape, _, result_str, result_values = _sql(_to_template(query_or_template, values))
+    variant = shape.variants.get(get_dialect(get_context().dialect))
+    if variant is not None and variant.text is result_str:
+        if variant.encoded is None:
+            shape_cache.resize(shape.key, shape, sys.getsizeof(variant.encode()))
+        return variant.encode(), result_values
+    return result_str.encode(), result_values
+
+
+class RenderedQuery:
+    __slots__ = ("query", "values", "kind", "shard_values")
+
+    def __init__(
+        self, query: str, values: Parameters, kind: QueryKind, shard_values: list | None = None
+    ) -> None:
+        self.query = query
+        self.values = values
+        self.kind = kind
+        # The values the shard column is restricted to, None if it isn't
+        self.shard_values = shard_values
+
+    def __repr__(self) -> str:
+        return (
+            f"RenderedQuery(query={self.query!r}, values={self.values!r}, kind={self.kind}, "
+            f"shard_values={self.shard_values!r})"
+        )
+
+
+def render(
+    query_or_template: str | Template | TTemplate,
+    values: dict[str, typing.Any] | None = None,
+    *,
+    shard_column: str | None = None,
+) -> RenderedQuery:
+    shape, arguments, result_str, result_values = _sql(_to_template(query_or_template, values))
+    shard_values = None
+    if shard_column is not None:
+        shard_values = _shard_values(shape, arguments, shard_column)
+    return RenderedQuery(result_str, result_values, _query_kind(shape, arguments), shard_values)
+
+
+def _query_kind(shape: Shape, arguments: list[object]) -> QueryKind:
+    # A lock clause is removed if any of its placeholders is Absent, in
+    # which case a locking read is just a read.
+    if shape.kind == QueryKind.LOCKING_READ and all(
+        any(arguments[slot] is RewritingValue.ABSENT for slot in slots)
+        for slots in shape.lock_slots
+    ):
+        return QueryKind.READ
+    return shape.kind
+
+
+def _shard_values(shape: Shape, arguments: list[object], column: str) -> list | None:
+    predicates = shape.shard_predicates.get(column.lower(), [])
+    result: list | None = None
+    for predicate in predicates:
+        values: list = []
+        for slot, is_sequence in predicate:
+            argument = arguments[slot]
+            if isinstance(argument, RewritingValue):
+                # The predicate is removed or rewritten to an IS test
+                break
+            elif is_sequence:
+                values.extend(typing.cast(typing.Iterable, argument))
+            else:
+                values.append(argument)
+        else:
+            if result is None:
+                result = values
+            else:
+                result = [value for value in result if value in values]
+    return result
+
+
+def _to_template(
+    query_or_template: str | Template | TTemplate, values: dict[str, typing.Any] | None
+) -> Template | TTemplate:
     if isinstance(query_or_template, (Template, TTemplate)) and values is None:
-        template = query_or_template
+        return query_or_template
     elif isinstance(query_or_template, str) and values is not None:
-        template = t(query_or_template, values)
+        return t(query_or_template, values)
     else:
         raise ValueError("Must call with a template, or a query string and values")
 
-    parsed_queries = parse(template)
-    result_str = ""
-    result_values: list[typing.Any] = []
+
+def _sql(template: Template | TTemplate) -> tuple[Shape, list[object], str, Parameters]:
     ctx = get_context()
-    for raw_parsed_query in parsed_queries:
-        parsed_query = deepcopy(raw_parsed_query)
-        new_values = _replace_placeholders(parsed_query, 0)
-        result_str += _print_node(parsed_query, [None] * len(result_values), ctx.dialect)
-        result_values.extend(new_values)
+    observers = _context_observers(ctx)
+    start = perf_counter() if observers else 0.0
+    key, arguments = template_key(template, ctx.limits)
+    return _sql_key(key, arguments, ctx, observers, start)
+
+
+def _context_observers(ctx: Context) -> tuple[Observer, ...]:
+    if _observers.global_observers:
+        return ctx.observers + _observers.global_observers
+    return ctx.observers
+
+
+def _sql_key(
+    key: ShapeKey,
+    arguments: list[object],
+    ctx: Context,
+    observers: tuple[Observer, ...],
+    start: float,
+) -> tuple[Shape, list[object], str, Parameters]:
+    # Renders a computed key, with start being when the render began
+    # (from before the key was computed) if there are observers.
+    if observers:
+        return _observed_sql(key, arguments, ctx, observers, start)
+
+    shape = shape_cache.get(key, limits=ctx.limits)
+    return shape, arguments, *_render(shape, arguments, ctx)
+
+
+def _observed_sql(
+    key: ShapeKey,
+    arguments: list[object],
+    ctx: Context,
+    observers: tuple[Observer, ...],
+    start: float,
+) -> tuple[Shape, list[object], str, Parameters]:
+    for observer in observers:
+        observer.on_render_start(key)
+    shape = shape_cache.get(key, observers, ctx.limits)
+    result_str, result_values = _render(shape, arguments, ctx)
+    event = RenderEvent(
+        key=key,
+        statements=len(shape.statements),
+        placeholders=len(shape.placeholders),
+        duration=perf_counter() - start,
+        query=result_str,
+        values=result_values,
+        arguments=arguments,
+    )
+    for observer in observers:
+        observer.on_render_end(event)
+    return shape, arguments, result_str, result_values
+
+
+def _render(shape: Shape, arguments: list[object], ctx: Context) -> tuple[str, Parameters]:
+    dialect = get_dialect(ctx.dialect)
+    limits = ctx.limits
+    if limits is not None:
+        limits.check_depth(shape.depth)
+
+    if shape.plain and not any(
+        isinstance(argument, (RewritingValue, LiteralValue)) for argument in arguments
+    ):
+        # The text only depends on the dialect, so is rendered once
+        variant = shape.variants.get(dialect)
+        if variant is None:
+            variant = _render_variant(shape, dialect)
+        if ctx.adapters is None:
+            result_values = [arguments[slot] for slot in variant.slots]
+        else:
+            adapt = ctx.adapters.adapt
+            result_values = [adapt(arguments[slot]) for slot in variant.slots]
+        if limits is not None:
+            limits.check_values(count_values(result_values))
+            limits.check_length(len(variant.text))
+        return variant.text, dialect.parameters(result_values)
 
+    result_str, result_values = _render_tree(shape, arguments, dialect, limits)
+    return result_str, dialect.parameters(result_values)
+
+
+def _render_tree(
+    shape: Shape, arguments: list[object], dialect: Dialect, limits: Limits | None
+) -> tuple[str, list]:
+    result_str = ""
+    result_values: list[typing.Any] = []
+    for statement_str, statement_values in _render_statements(
+        shape, arguments, dialect, limits, continued=True
+    ):
+        result_str += statement_str
+        result_values.extend(statement_values)
     return result_str, result_values
 
 
+def _render_statements(
+    shape: Shape,
+    arguments: list[object],
+    dialect: Dialect,
+    limits: Limits | None,
+    start: int = 0,
+    stop: int | None = None,
+    *,
+    continued: bool = False,
+    length: int = 0,
+    values_count: int = 0,
+) -> typing.Iterator[tuple[str, list]]:
+    # Each statement with its values, with the placeholders numbered
+    # from one unless continued from the preceding statements. The
+    # length and values count are those of any preceding statements,
+    # so that the limits apply to the whole query.
+    numbered = 0
+    for statement in shape.bind(arguments, start, stop):
+        new_values = _replace_placeholders(statement, 0)
+        if limits is not None:
+            values_count += count_values(new_values)
+            limits.check_values(values_count)
+        statement_str = _print_node(
+            statement,
+            [None] * numbered if continued else [],
+            dialect,
+            limits=limits,
+            offset=length,
+        )
+        length += len(statement_str)
+        numbered += len(new_values)
+        yield statement_str, new_values
+
+
+def _render_variant(shape: Shape, dialect: Dialect, cache: ShapeCache = shape_cache) -> Variant:
+    # Rendered with each slot as the value, in a plain context so that
+    # the slots aren't adapted, to find the order values are emitted.
+    token = _context_var.set(Context(dialect=dialect))
+    try:
+        text, slots = _render_tree(shape, list(range(len(shape.placeholders))), dialect, None)
+    finally:
+        _context_var.reset(token)
+    variant = Variant(text, tuple(slots))
+    if shape.variants.setdefault(dialect, variant) is not variant:
+        return shape.variants[dialect]
+    cache.resize(shape.key, shape, approximate_bytes(variant))
+    return variant
+
+
 class _ContextManager:
     def __init__(self, context: Context) -> None:
-        self._context = replace(context)
+        self._context = context.replace()
 
     def __enter__(self) -> Context:
         self._original_context = get_context()
@@ -146,6 +411,8 @@ def _safely_convert_placeholder_value(
     case_insensitive: set[str] | None = None,
     value_type: type = str,
 ) -> Part | Placeholder:
+    from numbers import Number  # Deferred as it is only needed for identifiers
+
     if isinstance(value, LiteralValue):
         if value.value is None:
             return Part(text="NULL", parent=parent_node)
@@ -178,28 +445,127 @@ def _safely_convert_placeholder_value(
         return Part(text=text, parent=parent_node)
 
 
+def _convert_rows(
+    rows: list | tuple,
+    columns: list[str],
+    parent_node: Expression,
+    ctx: Context,
+) -> tuple[Group, list[typing.Any]]:
+    # Composite IN, e.g. (a, b) IN {rows}. For asyncpg each column is
+    # sent as an array and unnested, so the text doesn't depend on the
+    # number of rows. Otherwise the rows are listed, padded to the next
+    # power of two by repeating the last row, so that few distinct
+    # texts are rendered.
+    for column in columns:
+        if column not in ctx.columns:
+            raise ValueError(f"{column} is not valid, must be one of {ctx.columns}")
+    if len(rows) == 0:
+        raise ValueError("Rows must not be empty")
+
+    checked = []
+    for row in rows:
+        if not isinstance(row, tuple) or len(row) != len(columns):
+            raise ValueError(f"{row} is not valid, must be a tuple of {len(columns)} values")
+        if ctx.adapters is not None:
+            row = tuple(ctx.adapters.adapt(value) for value in row)
+        checked.append(row)
+
+    group = Group(parent=parent_node)
+    if get_dialect(ctx.dialect).name == "asyncpg":
+        arrays = [list(values) for values in zip(*checked)]
+        unnest = Function(name="unnest", parent=group)
+        for position, array in enumerate(arrays):
+            if position > 0:
+                unnest.parts.append(Part(text=",", parent=unnest))
+            cast_ = Function(name="CAST", parent=unnest)
+            cast_.parts = [
+                Placeholder(parent=cast_, value=array),
+                Part(text=f"AS {_array_type(array)}[]", parent=cast_),
+            ]
+            unnest.parts.append(cast_)
+        group.parts = [Part(text="SELECT * FROM", parent=group), unnest]
+        return group, arrays
+
+    padding = (1 << (len(checked) - 1).bit_length()) - len(checked)
+    result = []
+    group.parts.append(Part(text="VALUES", parent=group))
+    for position, row in enumerate(checked + [checked[-1]] * padding):
+        if position > 0:
+            group.parts.append(Part(text=",", parent=group))
+        row_group = Group(parent=group)
+        for index, value in enumerate(row):
+            if index > 0:
+                row_group.parts.append(Part(text=",", parent=row_group))
+            row_group.parts.append(Placeholder(parent=row_group, value=value))
+            result.append(value)
+        group.parts.append(row_group)
+    return group, result
+
+
+def _array_type(values: list) -> str:
+    # Deferred as they are only needed for composite IN
+    import datetime
+    import decimal
+    import uuid
+
+    types = {type(value) for value in values if value is not None}
+    if len(types) == 1:
+        type_ = types.pop()
+        if issubclass(type_, datetime.datetime):
+            aware = any(value.tzinfo is not None for value in values if value is not None)
+            return "timestamptz" if aware else "timestamp"
+        for base, name in [
+            (bool, "bool"),
+            (int, "int8"),
+            (float, "float8"),
+            (decimal.Decimal, "numeric"),
+            (str, "text"),
+            (bytes, "bytea"),
+            (datetime.date, "date"),
+            (datetime.time, "time"),
+            (datetime.timedelta, "interval"),
+            (uuid.UUID, "uuid"),
+        ]:
+            if issubclass(type_, base):
+                return name
+    raise ValueError(f"Unable to infer the array type of {values}, values must share a type")
+
+
 def _print_node(
     node: Element,
     placeholders: list | None = None,
-    dialect: str = "sql",
+    dialect: Dialect = QMARK,
     strip: bool = True,
+    *,
+    limits: Limits | None = None,
+    offset: int = 0,
 ) -> str:
+    # The length limit is checked as each node is printed, with the
+    # offset being the length of the preceding statements, so that
+    # long queries are rejected without printing all of them.
     if placeholders is None:
         placeholders = []
 
     match node:
         case Statement():
-            result = " ".join(_print_node(clause, placeholders, dialect) for clause in node.clauses)
+            result = " ".join(
+                _print_node(clause, placeholders, dialect, limits=limits, offset=offset)
+                for clause in node.clauses
+            )
         case Clause() | ExpressionGroup():
             result = ""
 
             for expression in node.expressions:
-                addition = _print_node(expression, placeholders, dialect)
+                addition = _print_node(
+                    expression, placeholders, dialect, limits=limits, offset=offset
+                )
                 separator = ""
                 if result != "":
                     separator = expression.separator
                 if addition != "":
                     result += f" {separator} {addition}"
+                    if limits is not None:
+                        limits.check_length(offset + len(result))
 
             result = result.strip()
 
@@ -215,27 +581,41 @@ def _print_node(
                     result = f"{node.text} {result}"
         case Expression():
             if not node.removed:
-                result = " ".join(_print_node(part, placeholders, dialect) for part in node.parts)
+                result = " ".join(
+                    _print_node(part, placeholders, dialect, limits=limits, offset=offset)
+                    for part in node.parts
+                )
             else:
                 result = ""
         case Function():
-            arguments = " ".join(_print_node(part, placeholders, dialect) for part in node.parts)
+            arguments = " ".join(
+                _print_node(part, placeholders, dialect, limits=limits, offset=offset)
+                for part in node.parts
+            )
             result = f"{node.name}({arguments})"
         case Group():
-            result = (
-                f"({" ".join(_print_node(part, placeholders, dialect) for part in node.parts)})"
+            parts = " ".join(
+                _print_node(part, placeholders, dialect, limits=limits, offset=offset)
+                for part in node.parts
             )
-        case Operator():
-            result = node.text
-        case Part():
+            result = f"({parts})"
+        case Operator() | Part():
             result = node.text
+            if dialect.escape_percent:
+                result = result.replace("%", "%%")
         case Placeholder():
             placeholders.append(None)
-            result = f"${len(placeholders)}" if dialect == "asyncpg" else "?"
+            result = dialect.placeholder(len(placeholders))
         case Literal():
-            value = "".join(_print_node(part, placeholders, dialect, False) for part in node.parts)
+            value = "".join(
+                _print_node(part, placeholders, dialect, False, limits=limits, offset=offset)
+                for part in node.parts
+            )
             result = f"'{value}'"
 
+    if limits is not None:
+        limits.check_length(offset + len(result))
+
     if strip:
         return result.strip()
     else:
@@ -281,7 +661,7 @@ def _replace_placeholder(
         placeholder_type = clause_or_function.properties.placeholder_type
 
     value = node.value
-    new_node: Part | Placeholder
+    new_node: Group | Part | Placeholder
     if value is RewritingValue.ABSENT:
         if placeholder_type == PlaceholderType.VARIABLE_DEFAULT:
             new_node = Part(text="DEFAULT", parent=node.parent)
@@ -356,11 +736,23 @@ def _replace_placeholder(
                             else:
                                 part.text = "IS NOT"
                     new_node = Part(text="NULL", parent=node.parent)
+                elif (
+                    placeholder_type == PlaceholderType.VARIABLE_CONDITION
+                    and isinstance(value, (list, tuple))
+                    and (columns := row_columns(node)) is not None
+                ):
+                    new_node, rows_values = _convert_rows(
+                        value, columns, typing.cast(Expression, node.parent), ctx
+                    )
+                    result.extend(rows_values)
                 else:
                     new_node = node
 
         if isinstance(new_node, Placeholder):
-            result.append(new_node.value)  # type: ignore[arg-type]
+            if ctx.adapters is not None:
+                result.append(ctx.adapters.adapt(new_node.value))  # type: ignore[arg-type]
+            else:
+                result.append(new_node.value)  # type: ignore[arg-type]
 
         if isinstance(node.parent, (Expression, ExpressionGroup, Function, Group)):
             node.parent.parts[index] = new_node
@@ -0,0 +1,33 @@
+from __future__ import annotations
+
+import argparse
+import sys
+
+from sql_tstring.precompile import scan, write_manifest
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m sql_tstring")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    precompile = subparsers.add_parser(
+        "precompile", help="Parse the queries found in Python source and write a manifest"
+    )
+    precompile.add_argument("paths", nargs="+", help="Python files or directories to scan")
+    precompile.add_argument(
+        "-o", "--output", default="sql-tstring-manifest.json", help="Manifest path to write"
+    )
+
+    args = parser.parse_args(argv)
+
+    found = scan(args.paths)
+    errors = [query for query in found if query.error is not None]
+    for query in errors:
+        sys.stderr.write(f"{query.path}:{query.line}: {query.error}\n")
+    write_manifest(args.output, found)
+    sys.stdout.write(f"Found {len(found)} queries, {len(errors)} with errors\n")
+    return 1 if len(errors) > 0 else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+from typing import Any, Callable, Mapping
+
+type Adapter = Callable[[Any], Any]
+
+
+class Adapters:
+    # Converters for values by type, e.g. Enum members to their value,
+    # applied as values are emitted. Subclasses use the adapter of the
+    # nearest registered class in their MRO, resolved once per type.
+    __slots__ = ("_adapters", "_dispatch")
+
+    def __init__(self, adapters: Mapping[type, Adapter] | None = None) -> None:
+        self._adapters: dict[type, Adapter] = dict(adapters) if adapters is not None else {}
+        self._dispatch: dict[type, Adapter | None] = {}
+
+    def register(self, type_: type, adapter: Adapter) -> None:
+        self._adapters[type_] = adapter
+        self._dispatch = {}
+
+    def adapt(self, value: object) -> object:
+        # The elements of lists and tuples, e.g. = ANY({values}) or IN
+        # {values}, are adapted unless there is an adapter for the
+        # sequence itself.
+        try:
+            adapter = self._dispatch[type(value)]
+        except KeyError:
+            adapter = self._resolve(type(value))
+        if adapter is not None:
+            return adapter(value)
+        elif type(value) is list:
+            return [self.adapt(item) for item in value]
+        elif type(value) is tuple:
+            return tuple(self.adapt(item) for item in value)
+        return value
+
+    def _resolve(self, type_: type) -> Adapter | None:
+        adapter = None
+        for base in type_.__mro__:
+            if base in self._adapters:
+                adapter = self._adapters[base]
+                break
+        self._dispatch[type_] = adapter
+        return adapter
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Adapters):
+            return NotImplemented
+        return self._adapters == other._adapters
+
+    def __repr__(self) -> str:
+        return f"Adapters({self._adapters!r})"
@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+import asyncio
+from concurrent.futures import Executor
+from contextvars import copy_context
+from time import perf_counter
+from typing import Any, AsyncIterator, Callable
+
+from sql_tstring import (
+    _context_observers,
+    _render,
+    _render_statements,
+    _sql_key,
+    _to_template,
+    get_context,
+    Template,
+)
+from sql_tstring.cache import shape_cache
+from sql_tstring.dialects import Dialect, get_dialect, Parameters
+from sql_tstring.limits import count_values, Limits
+from sql_tstring.parser import Shape, ShapeKey, template_key
+from sql_tstring.t import Template as TTemplate
+
+# Renders of shapes with more placeholders and statements than this are
+# offloaded to an executor, as they would block the event loop for
+# milliseconds.
+DEFAULT_THRESHOLD = 1000
+
+
+async def render_async(
+    query_or_template: str | Template | TTemplate,
+    values: dict[str, Any] | None = None,
+    *,
+    executor: Executor | None = None,
+    threshold: int = DEFAULT_THRESHOLD,
+) -> tuple[str, Parameters]:
+    # The key is computed (checking the limits) once, and then used to
+    # render inline or in the executor.
+    template = _to_template(query_or_template, values)
+    ctx = get_context()
+    observers = _context_observers(ctx)
+    start = perf_counter() if observers else 0.0
+    key, arguments = template_key(template, ctx.limits)
+    if _is_small(key, threshold):
+        _, _, result_str, result_values = _sql_key(key, arguments, ctx, observers, start)
+    else:
+        # The context is copied so that the executor renders with it
+        loop = asyncio.get_running_loop()
+        _, _, result_str, result_values = await loop.run_in_executor(
+            executor, copy_context().run, _sql_key, key, arguments, ctx, observers, start
+        )
+    return result_str, result_values
+
+
+async def render_statements(
+    query_or_template: str | Template | TTemplate,
+    values: dict[str, Any] | None = None,
+    *,
+    executor: Executor | None = None,
+    threshold: int = DEFAULT_THRESHOLD,
+    chunksize: int = 100,
+) -> AsyncIterator[tuple[str, Parameters]]:
+    # Yields each statement with its own values (and placeholder
+    # numbering) so that it can be executed before the rest are
+    # rendered. The limits apply to the whole query. Observers are not
+    # called.
+    template = _to_template(query_or_template, values)
+    ctx = get_context()
+    key, arguments = template_key(template, ctx.limits)
+    loop = asyncio.get_running_loop()
+    context = copy_context()
+    small = _is_small(key, threshold)
+
+    async def run[T](function: Callable[..., T], *args: Any) -> T:
+        if small:
+            return function(*args)
+        return await loop.run_in_executor(executor, context.run, function, *args)
+
+    shape = await run(shape_cache.get, key, (), ctx.limits)
+    if len(shape.statements) == 1:
+        # Rendered as sql would, including from the variant of a plain shape
+        result_str, result_values = await run(_render, shape, arguments, ctx)
+        if result_str != "":
+            yield result_str, result_values
+        return
+
+    if ctx.limits is not None:
+        ctx.limits.check_depth(shape.depth)
+    dialect = get_dialect(ctx.dialect)
+    length = 0
+    values_count = 0
+    for start in range(0, len(shape.statements), chunksize):
+        chunk = await run(
+            _render_chunk,
+            shape,
+            arguments,
+            dialect,
+            ctx.limits,
+            start,
+            start + chunksize,
+            length,
+            values_count,
+        )
+        for statement_str, statement_values in chunk:
+            length += len(statement_str)
+            values_count += count_values(statement_values)
+            if statement_str != "":
+                yield statement_str, dialect.parameters(statement_values)
+
+
+def _is_small(key: ShapeKey, threshold: int) -> bool:
+    # Shapes are parsed in the executor the first time they are seen
+    if key not in shape_cache:
+        return False
+    shape = shape_cache.get(key)
+    return len(shape.placeholders) + len(shape.statements) <= threshold
+
+
+def _render_chunk(
+    shape: Shape,
+    arguments: list[object],
+    dialect: Dialect,
+    limits: Limits | None,
+    start: int,
+    stop: int,
+    length: int,
+    values_count: int,
+) -> list[tuple[str, list]]:
+    return list(
+        _render_statements(
+            shape,
+            arguments,
+            dialect,
+            limits,
+            start,
+            stop,
+            length=length,
+            values_count=values_count,
+        )
+    )
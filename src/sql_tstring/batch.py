@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+import hashlib
+import os
+from collections import deque
+from concurrent.futures import Executor, Future
+from contextvars import ContextVar
+from itertools import islice
+from typing import Any, cast, Iterable, Iterator, Mapping
+
+from sql_tstring import _context_var, Context, get_context, sql
+from sql_tstring.dialects import Dialect, DialectName, DIALECTS, get_dialect, Parameters
+from sql_tstring.limits import Limits
+from sql_tstring.t import split, SplitTemplate
+
+type _Chunk = list[tuple[str, Parameters]]
+
+# The split templates of a worker by digest of the template and context
+_worker_templates: ContextVar[dict[str, SplitTemplate]] = ContextVar("sql_tstring_worker_templates")
+
+
+class WorkerContext:
+    # The queries to render in an executor's workers and the parts of
+    # a context needed to do so, which are small and picklable.
+    # Adapters and observers are not, and would run on copies in the
+    # workers, so are rejected.
+    __slots__ = ("allow_numeric", "columns", "dialect", "limits", "tables", "templates")
+
+    def __init__(self, *templates: str, context: Context | None = None) -> None:
+        if context is None:
+            context = get_context()
+        if context.adapters is not None or len(context.observers) > 0:
+            raise ValueError("Adapters and observers can't be used with an executor")
+        self.allow_numeric = context.allow_numeric
+        self.columns = set(context.columns)
+        # Built in dialects are sent by name so that workers use their
+        # shared instances, and custom dialects are sent whole.
+        dialect = get_dialect(context.dialect)
+        self.dialect: DialectName | Dialect = (
+            cast(DialectName, dialect.name) if DIALECTS.get(dialect.name) is dialect else dialect
+        )
+        self.limits: Limits | None = context.limits
+        self.tables = set(context.tables)
+        self.templates = templates
+
+    def context(self) -> Context:
+        return Context(
+            self.allow_numeric, self.columns, self.dialect, self.tables, limits=self.limits
+        )
+
+    def digest(self, template: str) -> str:
+        # Stable across processes, unlike hash()
+        state = (
+            template,
+            self.allow_numeric,
+            sorted(self.columns),
+            _dialect_state(self.dialect),
+            repr(self.limits),
+            sorted(self.tables),
+        )
+        return hashlib.sha256(repr(state).encode()).hexdigest()
+
+
+def _dialect_state(dialect: DialectName | Dialect) -> object:
+    if isinstance(dialect, Dialect):
+        return (dialect.name, dialect.format, dialect.escape_percent, dialect.named)
+    return dialect
+
+
+def initialize_worker(worker_context: WorkerContext) -> None:
+    # The executor initializer, so that the templates and context are
+    # sent once to each worker rather than with every chunk.
+    _context_var.set(worker_context.context())
+    _worker_templates.set(
+        {worker_context.digest(template): split(template) for template in worker_context.templates}
+    )
+
+
+def render_batch(
+    template: str,
+    rows: Iterable[Mapping[str, Any]],
+    *,
+    executor: Executor | None = None,
+    chunksize: int = 1000,
+    max_pending: int | None = None,
+) -> Iterator[tuple[str, Parameters]]:
+    # The executor's workers are initialized with the template and
+    # context (which must match the current context), so that only the
+    # chunks of rows and the digest identifying the template are sent
+    # to them. Each worker then parses the shape once via its shape
+    # cache. Results are yielded in row order with at most max_pending
+    # chunks in flight.
+    context = get_context()
+    chunks = _chunks(rows, chunksize)
+    if executor is None:
+        return _render_serial(split(template), context, chunks)
+
+    if max_pending is None:
+        max_pending = 2 * (os.cpu_count() or 1)
+    digest = WorkerContext(context=context).digest(template)
+    return _render_parallel(digest, chunks, executor, max_pending)
+
+
+def _render_serial(
+    split_template: SplitTemplate, context: Context, chunks: Iterator[list[Mapping[str, Any]]]
+) -> Iterator[tuple[str, Parameters]]:
+    for chunk in chunks:
+        token = _context_var.set(context)
+        try:
+            results = [sql(split_template.template(row)) for row in chunk]
+        finally:
+            _context_var.reset(token)
+        yield from results
+
+
+def _render_parallel(
+    digest: str,
+    chunks: Iterator[list[Mapping[str, Any]]],
+    executor: Executor,
+    max_pending: int,
+) -> Iterator[tuple[str, Parameters]]:
+    pending: deque[Future[_Chunk]] = deque()
+    try:
+        for chunk in chunks:
+            pending.append(executor.submit(_render_chunk, digest, chunk))
+            if len(pending) >= max_pending:
+                yield from pending.popleft().result()
+        while len(pending) > 0:
+            yield from pending.popleft().result()
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+def _chunks(rows: Iterable[Mapping[str, Any]], chunksize: int) -> Iterator[list[Mapping[str, Any]]]:
+    iterator = iter(rows)
+    while chunk := list(islice(iterator, chunksize)):
+        yield chunk
+
+
+def _render_chunk(digest: str, rows: list[Mapping[str, Any]]) -> _Chunk:
+    try:
+        split_template = _worker_templates.get({})[digest]
+    except KeyError:
+        raise RuntimeError(
+            "The executor must be created with initializer=initialize_worker and "
+            "initargs=(WorkerContext(template),) in the current context"
+        ) from None
+    return [sql(split_template.template(row)) for row in rows]
@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import sys
+from typing import Iterator
+
+
+class CacheInfo:
+    __slots__ = ("name", "entries", "bytes", "maxsize", "max_bytes")
+
+    def __init__(
+        self, name: str, entries: int, bytes: int, maxsize: int, max_bytes: int | None
+    ) -> None:
+        self.name = name
+        self.entries = entries
+        self.bytes = bytes
+        self.maxsize = maxsize
+        self.max_bytes = max_bytes
+
+    def __repr__(self) -> str:
+        return (
+            f"CacheInfo(name={self.name!r}, entries={self.entries}, bytes={self.bytes}, "
+            f"maxsize={self.maxsize}, max_bytes={self.max_bytes})"
+        )
+
+
+# The caches are shared by all threads and safe to use without the
+# GIL. Lookups are plain dictionary reads, which are atomic and lock
+# free. Concurrent misses for the same key may both compute the value,
+# with the first stored winning, and eviction tolerates entries being
+# removed by other threads. The byte total is approximate, as updates
+# from concurrent threads may race.
+class SizedCache[K, V]:
+    def __init__(self, name: str, maxsize: int, max_bytes: int | None = None) -> None:
+        self.name = name
+        self.maxsize = maxsize
+        self.max_bytes = max_bytes
+        self._data: dict[K, V] = {}
+        self._sizes: dict[K, int] = {}
+        self._bytes = 0
+
+    def __contains__(self, key: K) -> bool:
+        return key in self._data
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def clear(self) -> None:
+        self._data.clear()
+        self._sizes.clear()
+        self._bytes = 0
+
+    def lookup(self, key: K) -> V | None:
+        return self._data.get(key)
+
+    def insert(self, key: K, value: V, size: int) -> V:
+        if self.maxsize <= 0 or (self.max_bytes is not None and size > self.max_bytes):
+            return value
+
+        self._evict(1, size)
+        result = self._data.setdefault(key, value)
+        if result is value:
+            self._sizes[key] = size
+            self._bytes += size
+        return result
+
+    def resize(self, key: K, value: V, delta: int) -> None:
+        # Accounts for memory added to a cached value after insertion
+        if self._data.get(key) is not value:
+            return
+        try:
+            self._sizes[key] += delta
+        except KeyError:
+            # Evicted by another thread
+            return
+        self._bytes += delta
+        self._evict(0, 0)
+
+    def items(self) -> list[tuple[K, V]]:
+        return list(self._data.copy().items())
+
+    def info(self) -> CacheInfo:
+        return CacheInfo(self.name, len(self._data), self._bytes, self.maxsize, self.max_bytes)
+
+    def _evict(self, entries: int, size: int) -> None:
+        # Drop the oldest entries, as the re module does, until there is
+        # room for the given number of entries and bytes.
+        while len(self._data) > 0 and (
+            len(self._data) + entries > self.maxsize
+            or (self.max_bytes is not None and self._bytes + size > self.max_bytes)
+        ):
+            try:
+                key = next(iter(self._data))
+                del self._data[key]
+            except (KeyError, RuntimeError, StopIteration):
+                # Another thread changed the cache, check again
+                continue
+            self._bytes -= self._sizes.pop(key, 0)
+
+
+def approximate_bytes(value: object) -> int:
+    # The memory used by the value and everything it references, other
+    # than parents and shared clause properties.
+    seen: set[int] = set()
+    size = 0
+    for item in _referenced(value):
+        if id(item) not in seen:
+            seen.add(id(item))
+            size += sys.getsizeof(item)
+    return size
+
+
+def _referenced(value: object) -> Iterator[object]:
+    stack = [value]
+    while len(stack) > 0:
+        item = stack.pop()
+        if item is None or isinstance(item, (bool, int, float)):
+            continue
+        yield item
+        if isinstance(item, (list, tuple)):
+            stack.extend(item)
+        elif isinstance(item, dict):
+            stack.extend(item.keys())
+            stack.extend(item.values())
+        elif not isinstance(item, (str, bytes)):
+            for name in getattr(type(item), "__slots__", ()):
+                if name not in {"parent", "properties"}:
+                    stack.append(getattr(item, name, None))
@@ -0,0 +1,183 @@
+from __future__ import annotations
+
+import os
+from time import perf_counter
+from typing import TYPE_CHECKING
+
+from sql_tstring.budget import approximate_bytes, CacheInfo, SizedCache
+from sql_tstring.limits import Limits
+from sql_tstring.observers import Observer, ParseEvent
+from sql_tstring.parser import (
+    ClauseDictionary,
+    ClauseProperties,
+    CLAUSES,
+    fragment_cache,
+    OPERATORS,
+    parse_shape,
+    Shape,
+    SHAPE_FORMAT,
+    ShapeKey,
+)
+from sql_tstring.t import split_cache
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+
+# The cached shapes are never mutated (renders bind values into a
+# copy), other than to add their rendered variants, see SizedCache for
+# the thread safety.
+class ShapeCache(SizedCache[ShapeKey, Shape]):
+    def __init__(
+        self,
+        maxsize: int = 4096,
+        directory: str | os.PathLike | None = None,
+        max_bytes: int | None = None,
+    ) -> None:
+        super().__init__("shapes", maxsize, max_bytes)
+        self.directory = directory
+
+    def get(
+        self, key: ShapeKey, observers: tuple[Observer, ...] = (), limits: Limits | None = None
+    ) -> Shape:
+        try:
+            return self._data[key]
+        except KeyError:
+            pass
+
+        if self.directory is None:
+            shape = _parse(key, observers, limits)
+        else:
+            path = _shape_path(self.directory, key)
+            entry = _read_entry(path)
+            if entry is not None and entry[0] == key:
+                shape = entry[1]
+            else:
+                shape = _parse(key, observers, limits)
+                _write_shape(path, key, shape)
+        return self.add(key, shape)
+
+    def add(self, key: ShapeKey, shape: Shape) -> Shape:
+        return self.insert(key, shape, approximate_bytes(shape))
+
+
+shape_cache = ShapeCache()
+
+
+def cache_info() -> list[CacheInfo]:
+    # The shapes include their rendered variants. The dialects'
+    # placeholder tables, the adapters' dispatch tables and the stats
+    # registries aren't caches of queries and so aren't included.
+    return [shape_cache.info(), fragment_cache.info(), split_cache.info()]
+
+
+def dump(directory: str | os.PathLike, cache: ShapeCache | None = None) -> int:
+    if cache is None:
+        cache = shape_cache
+    count = 0
+    for key, shape in cache.items():
+        _write_shape(_shape_path(directory, key), key, shape)
+        count += 1
+    return count
+
+
+def load(directory: str | os.PathLike, cache: ShapeCache | None = None) -> int:
+    if cache is None:
+        cache = shape_cache
+    from pathlib import Path
+
+    path = Path(directory) / fingerprint()
+    if not path.is_dir():
+        return 0
+
+    count = 0
+    for shape_path in path.glob("*.pickle"):
+        entry = _read_entry(shape_path)
+        if entry is not None:
+            cache.add(*entry)
+            count += 1
+    return count
+
+
+_library_version: str | None = None
+
+
+def fingerprint() -> str:
+    # Shapes are stored in a directory named by this fingerprint, so
+    # upgrading the library or changing the grammar tables invalidates
+    # any existing entries.
+    global _library_version
+
+    import hashlib
+
+    if _library_version is None:
+        from importlib.metadata import PackageNotFoundError, version
+
+        try:
+            _library_version = version("sql-tstring")
+        except PackageNotFoundError:
+            _library_version = "unknown"
+
+    grammar = repr((_library_version, SHAPE_FORMAT, _canonical(CLAUSES), _canonical(OPERATORS)))
+    return hashlib.sha256(grammar.encode()).hexdigest()[:16]
+
+
+def _canonical(entry: ClauseDictionary | ClauseProperties | dict) -> object:
+    # Sets and dictionaries are sorted so that the representation does
+    # not depend on the hash seed.
+    if isinstance(entry, ClauseProperties):
+        return (entry.allow_empty, entry.placeholder_type.name, sorted(entry.separators))
+    else:
+        return sorted((key, _canonical(value)) for key, value in entry.items())
+
+
+def _parse(key: ShapeKey, observers: tuple[Observer, ...], limits: Limits | None) -> Shape:
+    # The depth limit is checked as the query is parsed, so that deep
+    # queries are rejected before the recursive passes over the tree.
+    if not observers:
+        return parse_shape(key, limits)
+
+    for observer in observers:
+        observer.on_parse_start(key)
+    start = perf_counter()
+    shape = parse_shape(key, limits)
+    event = ParseEvent(
+        key=key,
+        statements=len(shape.statements),
+        placeholders=len(shape.placeholders),
+        duration=perf_counter() - start,
+    )
+    for observer in observers:
+        observer.on_parse_end(event)
+    return shape
+
+
+def _shape_path(directory: str | os.PathLike, key: ShapeKey) -> Path:
+    import hashlib
+    from pathlib import Path
+
+    digest = hashlib.sha256(repr(key).encode()).hexdigest()
+    return Path(directory) / fingerprint() / f"{digest}.pickle"
+
+
+def _read_entry(path: Path) -> tuple[ShapeKey, Shape] | None:
+    import pickle
+
+    try:
+        with path.open("rb") as file_:
+            key, shape = pickle.load(file_)
+    except Exception:
+        # A missing, corrupt or incompatible entry is treated as a miss
+        return None
+    else:
+        return key, shape
+
+
+def _write_shape(path: Path, key: ShapeKey, shape: Shape) -> None:
+    import pickle
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temporary = path.with_suffix(f".{os.getpid()}.tmp")
+    with temporary.open("wb") as file_:
+        pickle.dump((key, shape), file_, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temporary, path)
@@ -0,0 +1,202 @@
+from __future__ import annotations
+
+import sys
+import typing
+import warnings
+from types import TracebackType
+from typing import Callable, TYPE_CHECKING
+
+from sql_tstring import _ContextManager, get_context, LiteralValue, RewritingValue, sql_context
+from sql_tstring.cache import shape_cache
+from sql_tstring.dialects import get_dialect
+from sql_tstring.observers import Observer, RenderEvent
+from sql_tstring.parser import Literal, placeholder_type, PlaceholderType, row_columns
+from sql_tstring.stats import describe
+
+if TYPE_CHECKING:
+    from sql_tstring.parser import ShapeKey
+
+
+class RepeatedRenderWarning(UserWarning):
+    pass
+
+
+class ShapeExplosionWarning(UserWarning):
+    pass
+
+
+class ShapeExplosionError(ValueError):
+    pass
+
+
+class RepeatedRender:
+    __slots__ = ("query", "count", "filename", "lineno")
+
+    def __init__(self, query: str, count: int, filename: str, lineno: int) -> None:
+        self.query = query
+        self.count = count
+        self.filename = filename
+        self.lineno = lineno
+
+    def __str__(self) -> str:
+        return (
+            f"{self.query!r} rendered {self.count} times with only the values changing, "
+            f"at {self.filename}:{self.lineno}, consider batching"
+        )
+
+
+class RepeatedRenderDetector(Observer):
+    def __init__(
+        self, threshold: int, callback: Callable[[RepeatedRender], None] | None = None
+    ) -> None:
+        self.threshold = threshold
+        self.callback = callback
+        self.counts: dict[tuple[ShapeKey, str], int] = {}
+
+    def on_render_end(self, event: RenderEvent) -> None:
+        # Renders are counted by shape and query text, as a shape can
+        # render to different queries (e.g. with Absent values).
+        key = (event.key, event.query)
+        count = self.counts.get(key, 0) + 1
+        self.counts[key] = count
+        if count == self.threshold + 1:
+            filename, lineno = _call_site()
+            repeated = RepeatedRender(event.query, count, filename, lineno)
+            if self.callback is not None:
+                self.callback(repeated)
+            else:
+                warnings.warn_explicit(str(repeated), RepeatedRenderWarning, filename, lineno)
+
+
+class _DetectionScope:
+    def __init__(self, detector: RepeatedRenderDetector) -> None:
+        self._detector = detector
+
+    def __enter__(self) -> RepeatedRenderDetector:
+        observers = get_context().observers + (self._detector,)
+        self._context_manager: _ContextManager = sql_context(observers=observers)
+        self._context_manager.__enter__()
+        return self._detector
+
+    def __exit__(
+        self,
+        _type: type[BaseException] | None,
+        _value: BaseException | None,
+        _traceback: TracebackType | None,
+    ) -> None:
+        self._context_manager.__exit__(_type, _value, _traceback)
+
+
+def detect_repeated_renders(
+    threshold: int = 10, callback: Callable[[RepeatedRender], None] | None = None
+) -> _DetectionScope:
+    return _DetectionScope(RepeatedRenderDetector(threshold, callback))
+
+
+_VARIABLE_TYPES = {
+    PlaceholderType.VARIABLE,
+    PlaceholderType.VARIABLE_CONDITION,
+    PlaceholderType.VARIABLE_DEFAULT,
+}
+
+
+class _ShapeVariation:
+    __slots__ = ("queries", "signatures", "reported", "rows", "variable")
+
+    def __init__(self, variable: list[bool], rows: list[bool]) -> None:
+        self.queries: set[str] = set()
+        self.signatures: list[set[object]] = [set() for _ in variable]
+        self.reported = False
+        # Whether each placeholder is a row value's rows, (a, b) IN {rows}
+        self.rows = rows
+        # Whether each placeholder is bound as a parameter
+        self.variable = variable
+
+
+class ShapeTracker(Observer):
+    def __init__(self, limit: int = 32, action: typing.Literal["warn", "raise"] = "warn") -> None:
+        self.limit = limit
+        self.action = action
+        self.shapes: dict[ShapeKey, _ShapeVariation] = {}
+
+    def on_render_end(self, event: RenderEvent) -> None:
+        try:
+            variation = self.shapes[event.key]
+        except KeyError:
+            variation = self.shapes[event.key] = _ShapeVariation(
+                _variable_placeholders(event.key), _row_placeholders(event.key)
+            )
+
+        if event.query in variation.queries:
+            return
+
+        # The rows are unnested from arrays for asyncpg, so their number
+        # doesn't change the text
+        padded = get_dialect(get_context().dialect).name != "asyncpg"
+        for signatures, is_variable, is_rows, argument in zip(
+            variation.signatures, variation.variable, variation.rows, event.arguments
+        ):
+            signatures.add(_signature(argument, is_variable, is_rows and padded))
+
+        if len(variation.queries) < self.limit:
+            variation.queries.add(event.query)
+        else:
+            message = (
+                f"{describe(event.key)!r} has produced more than {self.limit} distinct queries, "
+                f"varying with placeholders {self.drivers(event.key)}"
+            )
+            if self.action == "raise":
+                raise ShapeExplosionError(message)
+            elif not variation.reported:
+                variation.reported = True
+                filename, lineno = _call_site()
+                warnings.warn_explicit(message, ShapeExplosionWarning, filename, lineno)
+
+    def drivers(self, key: ShapeKey) -> list[int]:
+        # The (1-based) positions of the placeholders whose values have
+        # changed the query text
+        return [
+            position
+            for position, signatures in enumerate(self.shapes[key].signatures, start=1)
+            if len(signatures) > 1
+        ]
+
+
+def _variable_placeholders(key: ShapeKey) -> list[bool]:
+    return [
+        isinstance(placeholder.parent, Literal) or placeholder_type(placeholder) in _VARIABLE_TYPES
+        for placeholder in shape_cache.get(key).placeholders
+    ]
+
+
+def _row_placeholders(key: ShapeKey) -> list[bool]:
+    return [
+        row_columns(placeholder) is not None for placeholder in shape_cache.get(key).placeholders
+    ]
+
+
+def _signature(value: object, is_variable: bool, is_rows: bool = False) -> object:
+    # The part of a value that affects the query text
+    if isinstance(value, RewritingValue):
+        return value
+    elif is_rows and isinstance(value, (list, tuple)):
+        # The rows are padded to the next power of two
+        return ("rows", 1 << max(len(value) - 1, 0).bit_length())
+    elif is_variable:
+        return None
+    elif isinstance(value, LiteralValue):
+        return ("literal", repr(value.value))
+    else:
+        return repr(value)
+
+
+def _call_site() -> tuple[str, int]:
+    # The first frame outside of this library
+    frame = sys._getframe(1)
+    while frame.f_back is not None and _is_internal(frame.f_globals.get("__name__", "")):
+        frame = frame.f_back
+    return frame.f_code.co_filename, frame.f_lineno
+
+
+def _is_internal(module: str) -> bool:
+    return module == "sql_tstring" or module.startswith("sql_tstring.")
@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+from typing import Any, Literal
+
+type DialectName = Literal["asyncpg", "format", "named", "numeric", "psycopg", "qmark", "sql"]
+# The values as a list, or as a mapping by name for named dialects
+type Parameters = list[Any] | dict[str, Any]
+
+
+class Dialect:
+    # How placeholders are written, either the same token for every
+    # placeholder or a format with the 1-based position e.g. "${}".
+    # Numbered tokens are formatted once and kept in a table.
+    __slots__ = ("name", "format", "escape_percent", "named", "_constant", "_tokens")
+
+    def __init__(
+        self, name: str, format: str, *, escape_percent: bool = False, named: bool = False
+    ) -> None:
+        self.name = name
+        self.format = format
+        # Whether literal % must be written as %% (pyformat drivers)
+        self.escape_percent = escape_percent
+        # Whether the values are bound by name, being the token without
+        # its prefix character e.g. "p1" for ":p1"
+        self.named = named
+        self._constant = format if "{}" not in format else None
+        self._tokens: list[str] = []
+
+    def placeholder(self, position: int) -> str:
+        if self._constant is not None:
+            return self._constant
+        tokens = self._tokens
+        if position >= len(tokens):
+            # Replaced rather than extended, so concurrent readers
+            # always see a complete table.
+            size = max(position + 1, 2 * len(tokens), 64)
+            tokens = tokens + [self.format.format(index) for index in range(len(tokens), size)]
+            self._tokens = tokens
+        return tokens[position]
+
+    def parameters(self, values: list[Any]) -> Parameters:
+        if not self.named:
+            return values
+        return {
+            self.placeholder(position)[1:]: value for position, value in enumerate(values, start=1)
+        }
+
+    def __repr__(self) -> str:
+        return f"Dialect({self.name!r}, {self.format!r})"
+
+
+QMARK = Dialect("qmark", "?")
+DOLLAR = Dialect("asyncpg", "${}")
+FORMAT = Dialect("format", "%s", escape_percent=True)
+NAMED = Dialect("named", ":p{}", named=True)
+NUMERIC = Dialect("numeric", ":{}")
+
+DIALECTS: dict[str, Dialect] = {
+    "asyncpg": DOLLAR,
+    "format": FORMAT,
+    "named": NAMED,
+    "numeric": NUMERIC,
+    "psycopg": FORMAT,
+    "qmark": QMARK,
+    "sql": QMARK,
+}
+
+
+def get_dialect(dialect: DialectName | Dialect) -> Dialect:
+    if isinstance(dialect, Dialect):
+        return dialect
+    try:
+        return DIALECTS[dialect]
+    except KeyError:
+        raise ValueError(f"{dialect} is not a valid dialect, must be one of {set(DIALECTS)}")
@@ -0,0 +1,263 @@
+from __future__ import annotations
+
+import random
+from time import perf_counter
+from typing import Any, Callable, Iterable, Iterator
+
+from sql_tstring import (
+    _print_node,
+    _replace_placeholders,
+    Absent,
+    get_context,
+    IsNotNull,
+    IsNull,
+    LiteralValue,
+    Predicate,
+    sql,
+    sql_context,
+    Template,
+)
+from sql_tstring.dialects import get_dialect, Parameters
+from sql_tstring.parser import parse
+from sql_tstring.t import t, Template as TTemplate
+
+type Engine = Callable[[Template | TTemplate], tuple[str, Parameters]]
+type Outcome = tuple[str, Parameters] | str
+
+COLUMNS = {"a", "b", "c"}
+TABLES = {"x", "y"}
+
+
+class Case:
+    __slots__ = ("query", "values")
+
+    def __init__(self, query: str, values: dict[str, Any]) -> None:
+        self.query = query
+        self.values = values
+
+    def __repr__(self) -> str:
+        return f"Case({self.query!r}, {self.values!r})"
+
+
+class Mismatch:
+    __slots__ = ("case", "dialect", "expected", "actual")
+
+    def __init__(self, case: Case, dialect: str, expected: Outcome, actual: Outcome) -> None:
+        self.case = case
+        self.dialect = dialect
+        self.expected = expected
+        self.actual = actual
+
+    def __repr__(self) -> str:
+        return (
+            f"Mismatch({self.case!r}, dialect={self.dialect!r}, expected={self.expected!r}, "
+            f"actual={self.actual!r})"
+        )
+
+
+class Report:
+    __slots__ = ("renders", "mismatches", "reference_time", "candidate_time")
+
+    def __init__(self) -> None:
+        self.renders = 0
+        self.mismatches: list[Mismatch] = []
+        self.reference_time = 0.0
+        self.candidate_time = 0.0
+
+    def __repr__(self) -> str:
+        return (
+            f"Report(renders={self.renders}, mismatches={len(self.mismatches)}, "
+            f"reference_time={self.reference_time:.6f}, candidate_time={self.candidate_time:.6f})"
+        )
+
+
+def reference(template: Template | TTemplate) -> tuple[str, Parameters]:
+    # The original pipeline, parsing on every render without a cache
+    dialect = get_dialect(get_context().dialect)
+    result_str = ""
+    result_values: list[Any] = []
+    for parsed_query in parse(template):
+        new_values = _replace_placeholders(parsed_query, 0)
+        result_str += _print_node(parsed_query, [None] * len(result_values), dialect)
+        result_values.extend(new_values)
+    return result_str, dialect.parameters(result_values)
+
+
+def compare(
+    cases: Iterable[Case],
+    candidate: Engine = sql,
+    *,
+    baseline: Engine = reference,
+    dialects: Iterable[str] = ("sql", "asyncpg"),
+) -> Report:
+    # Each case is rendered by both engines for each dialect, with the
+    # outcome being the query and values or the type of error raised.
+    report = Report()
+    dialects = list(dialects)
+    for case in cases:
+        for dialect in dialects:
+            with sql_context(columns=COLUMNS, dialect=dialect, tables=TABLES):  # type: ignore
+                expected, duration = _run(baseline, case)
+                report.reference_time += duration
+                actual, duration = _run(candidate, case)
+                report.candidate_time += duration
+            report.renders += 1
+            if expected != actual:
+                report.mismatches.append(Mismatch(case, dialect, expected, actual))
+    return report
+
+
+def _run(engine: Engine, case: Case) -> tuple[Outcome, float]:
+    template = t(case.query, case.values)
+    start = perf_counter()
+    try:
+        outcome: Outcome = engine(template)
+    except Exception as error:
+        outcome = type(error).__name__
+    return outcome, perf_counter() - start
+
+
+# Drawn from the tests, covering the parsing and rewriting rules
+CORPUS = [
+    Case("SELECT x FROM y WHERE x = 'NONE' AND y = 'FUNC_LIKE('", {}),
+    Case("SELECT COALESCE(x, 'a') FROM y WHERE x = 'AB''C'", {}),
+    Case('SELECT "x" FROM "y"', {}),
+    Case("select x\n  from y\n where x = {v}", {"v": 2}),
+    Case("DELETE FROM y WHERE x = {v} RETURNING x", {"v": Absent}),
+    Case("WITH cte AS (SELECT x FROM y WHERE z = {v}) SELECT x FROM cte", {"v": 1}),
+    Case(
+        "WITH cte AS (SELECT x FROM y UNION SELECT x FROM z) SELECT x FROM cte WHERE x = {v}",
+        {"v": IsNull},
+    ),
+    Case(
+        "INSERT INTO y (a, b) VALUES ({v}, {w}) ON CONFLICT (a) DO UPDATE SET b = {w}",
+        {"v": 1, "w": Absent},
+    ),
+    Case("INSERT INTO tbl DEFAULT VALUES RETURNING id", {}),
+    Case("SELECT x FROM y WHERE (DATE(x) = {v} OR x = 2) AND y = {w}", {"v": Absent, "w": 3}),
+    Case("SELECT x FROM y WHERE x IN (SELECT z FROM w WHERE u = {v})", {"v": 1}),
+    Case("SELECT x FROM y WHERE {inner}", {"inner": t("x = {v}", {"v": 1})}),
+    Case("(SELECT x FROM y) UNION ALL (SELECT z FROM y WHERE a = {v})", {"v": IsNotNull}),
+    Case("SELECT x FROM y WHERE DATE(x AT TIME ZONE {v}) >= {w}", {"v": "uk", "w": 2}),
+    Case("SELECT x FROM y WHERE x = ANY({v})", {"v": [1, 2]}),
+    Case("SELECT {col} FROM {tbl} ORDER BY {col} {dir}", {"col": "a", "tbl": "x", "dir": "DESC"}),
+    Case("SELECT {col} FROM y", {"col": "invalid"}),
+    Case("SELECT x FROM y LIMIT {v} OFFSET {w}", {"v": 2, "w": Absent}),
+    Case("SELECT x FROM y ORDER BY ARRAY_POSITION({v}, x)", {"v": [1]}),
+    Case("SELECT x FROM y WHERE x LIKE '%{v}'", {"v": "a"}),
+    Case("SELECT x FROM y WHERE x LIKE '%{v}'", {"v": 1}),
+    Case("SELECT {v}, {w}, {u}", {"v": LiteralValue(None), "w": LiteralValue(True), "u": 1}),
+    Case("SELECT x FROM y FOR UPDATE {v}", {"v": "SKIP LOCKED"}),
+    Case("SELECT x FROM y FOR UPDATE {v}", {"v": Absent}),
+    Case("SELECT x OVER(PARTITION BY x ROWS {v} PRECEDING) FROM y", {"v": 2}),
+    Case("UPDATE y SET a = {v}, b = {w} WHERE c = {u}", {"v": 1, "w": Absent, "u": IsNull}),
+    Case("SELECT x FROM y WHERE x = 2 AND (v = {v} OR u = {w})", {"v": Absent, "w": Absent}),
+    Case("SELECT x FROM y; SELECT z FROM y WHERE a = {v}", {"v": 1}),
+    Case("SELECT x FROM y WHERE (a, b) IN {v}", {"v": [(1, "a"), (2, "b"), (3, "c")]}),
+    Case(
+        "SELECT x FROM y WHERE {p}",
+        {"p": Predicate("a = {v}", {"v": 1}) & Predicate("b = {v}", {"v": Absent})},
+    ),
+]
+
+_OPERATORS = ["=", "<>", "!=", ">", "<", ">=", "<=", "LIKE", "ILIKE", "NOT LIKE", "IS NOT"]
+_VALUES: list[object] = [1, "a", None, 2.5, Absent, IsNull, IsNotNull]
+
+
+def generate(count: int, seed: int = 0) -> Iterator[Case]:
+    # Random queries built from the clauses, operators, literals,
+    # nested templates and rewriting values the parser supports.
+    rng = random.Random(seed)
+    for _ in range(count):
+        values: dict[str, Any] = {}
+        query = rng.choice([_select, _update, _insert, _delete, _with])(rng, values)
+        yield Case(query, values)
+
+
+def _name(values: dict[str, Any], value: object) -> str:
+    name = f"v{len(values)}"
+    values[name] = value
+    return f"{{{name}}}"
+
+
+def _condition(rng: random.Random, values: dict[str, Any], depth: int = 0) -> str:
+    column = rng.choice(sorted(COLUMNS))
+    kind = rng.randrange(7 if depth < 2 else 5)
+    if kind == 0:
+        return f"{column} {rng.choice(_OPERATORS)} {_name(values, rng.choice(_VALUES))}"
+    elif kind == 1:
+        return f"{column} = ANY({_name(values, rng.choice([[1, 2], Absent]))})"
+    elif kind == 2:
+        return f"{column} LIKE '%{_name(values, rng.choice(['a', 'b%']))}%'"
+    elif kind == 3:
+        return f"COALESCE({column}, {_name(values, rng.choice(_VALUES))}) = 1"
+    elif kind == 4:
+        return f"{column} = 'literal'"
+    elif kind == 5:
+        inner: dict[str, Any] = {}
+        condition = _condition(rng, inner, depth + 1)
+        return _name(values, t(condition, inner))
+    else:
+        return f"({_conditions(rng, values, depth + 1)})"
+
+
+def _conditions(rng: random.Random, values: dict[str, Any], depth: int = 0) -> str:
+    conditions = [_condition(rng, values, depth) for _ in range(rng.randint(1, 3))]
+    result = conditions[0]
+    for condition in conditions[1:]:
+        result += f" {rng.choice(['AND', 'OR'])} {condition}"
+    return result
+
+
+def _where(rng: random.Random, values: dict[str, Any]) -> str:
+    return f" WHERE {_conditions(rng, values)}" if rng.random() < 0.8 else ""
+
+
+def _table(rng: random.Random, values: dict[str, Any]) -> str:
+    if rng.random() < 0.3:
+        return _name(values, rng.choice(sorted(TABLES)))
+    return rng.choice(sorted(TABLES))
+
+
+def _select(rng: random.Random, values: dict[str, Any]) -> str:
+    columns = rng.choice(["a", "a, b", "COUNT(*)", None])
+    if columns is None:
+        columns = _name(values, rng.choice(["a", "b", "z"]))
+    query = f"SELECT {columns} FROM {_table(rng, values)}"
+    if rng.random() < 0.3:
+        query += f" JOIN {rng.choice(sorted(TABLES))} ON a = {_name(values, 1)}"
+    query += _where(rng, values)
+    if rng.random() < 0.3:
+        query += f" GROUP BY a HAVING COUNT(*) > {_name(values, rng.choice([1, Absent]))}"
+    if rng.random() < 0.5:
+        direction = _name(values, rng.choice(["ASC", "desc", Absent]))
+        query += f" ORDER BY {_name(values, rng.choice(['a', 'b']))} {direction}"
+    if rng.random() < 0.5:
+        query += f" LIMIT {_name(values, rng.choice([10, Absent]))}"
+    if rng.random() < 0.3:
+        query += f" OFFSET {_name(values, rng.choice([5, Absent]))}"
+    if rng.random() < 0.2:
+        query += f" FOR UPDATE {_name(values, rng.choice(['NOWAIT', '', Absent]))}"
+    return query
+
+
+def _update(rng: random.Random, values: dict[str, Any]) -> str:
+    sets = ", ".join(f"{column} = {_name(values, rng.choice(_VALUES))}" for column in "ab")
+    returning = " RETURNING a" if rng.random() < 0.3 else ""
+    return f"UPDATE {_table(rng, values)} SET {sets}{_where(rng, values)}{returning}"
+
+
+def _insert(rng: random.Random, values: dict[str, Any]) -> str:
+    row = ", ".join(_name(values, rng.choice([1, "a", Absent])) for _ in range(2))
+    query = f"INSERT INTO {rng.choice(sorted(TABLES))} (a, b) VALUES ({row})"
+    if rng.random() < 0.4:
+        query += f" ON CONFLICT (a) DO UPDATE SET b = {_name(values, rng.choice([1, Absent]))}"
+    return query
+
+
+def _delete(rng: random.Random, values: dict[str, Any]) -> str:
+    return f"DELETE FROM {rng.choice(sorted(TABLES))}{_where(rng, values)}"
+
+
+def _with(rng: random.Random, values: dict[str, Any]) -> str:
+    return f"WITH cte AS ({_select(rng, values)}) SELECT a FROM cte{_where(rng, values)}"
@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+
+class LimitExceededError(ValueError):
+    def __init__(self, limit: str, maximum: int) -> None:
+        super().__init__(limit, maximum)
+        self.limit = limit
+        self.maximum = maximum
+
+    def __str__(self) -> str:
+        return f"The {self.limit} exceeds the limit of {self.maximum}"
+
+
+class Limits:
+    # Caps on the size of queries, to reject oversized inputs before
+    # they take significant time to parse or render. The depth is that
+    # of nested templates and predicates, and of groups, functions and
+    # sub-statements.
+    __slots__ = ("max_depth", "max_length", "max_placeholders", "max_values")
+
+    def __init__(
+        self,
+        *,
+        max_depth: int | None = None,
+        max_length: int | None = None,
+        max_placeholders: int | None = None,
+        max_values: int | None = None,
+    ) -> None:
+        self.max_depth = max_depth
+        self.max_length = max_length
+        self.max_placeholders = max_placeholders
+        self.max_values = max_values
+
+    def check_depth(self, depth: int) -> None:
+        if self.max_depth is not None and depth > self.max_depth:
+            raise LimitExceededError("depth", self.max_depth)
+
+    def check_length(self, length: int) -> None:
+        if self.max_length is not None and length > self.max_length:
+            raise LimitExceededError("length", self.max_length)
+
+    def check_placeholders(self, placeholders: int) -> None:
+        if self.max_placeholders is not None and placeholders > self.max_placeholders:
+            raise LimitExceededError("number of placeholders", self.max_placeholders)
+
+    def check_values(self, values: int) -> None:
+        if self.max_values is not None and values > self.max_values:
+            raise LimitExceededError("number of values", self.max_values)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Limits):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"Limits({fields})"
+
+
+def count_values(values: list) -> int:
+    # Sequences (e.g. for IN or ANY) count by their elements
+    return sum(len(value) if isinstance(value, (list, tuple)) else 1 for value in values)
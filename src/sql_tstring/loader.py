@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import os
+import re
+from pathlib import Path
+from typing import Any, Iterator, Mapping
+
+from sql_tstring import render, RenderedQuery, sql
+from sql_tstring.cache import shape_cache
+from sql_tstring.dialects import Parameters
+from sql_tstring.t import split, SplitTemplate, Template
+
+NAME_RE = re.compile(r"^--\s*name:\s*(\S+)\s*$", re.MULTILINE)
+COMMENT_RE = re.compile(r"^\s*--.*$\n?", re.MULTILINE)
+
+
+class Query:
+    __slots__ = ("name", "text", "path", "_split")
+
+    def __init__(self, name: str, text: str, path: str) -> None:
+        self.name = name
+        self.text = text
+        self.path = path
+        self._split: SplitTemplate | None = None
+
+    def sql(self, values: Mapping[str, Any]) -> tuple[str, Parameters]:
+        return sql(self._template(values))
+
+    def render(
+        self, values: Mapping[str, Any], *, shard_column: str | None = None
+    ) -> RenderedQuery:
+        return render(self._template(values), shard_column=shard_column)
+
+    def _template(self, values: Mapping[str, Any]) -> Template:
+        split_template = self._split
+        if split_template is None:
+            # Parsed once, on first use
+            split_template = split(self.text)
+            shape_cache.get(tuple(split_template.parts))
+            self._split = split_template
+        return split_template.template(values)
+
+    def __repr__(self) -> str:
+        return f"Query(name={self.name!r}, path={self.path!r})"
+
+
+class Queries:
+    # The named queries in .sql files, indexed on first access and
+    # parsed on first use.
+    def __init__(self, paths: list[Path]) -> None:
+        self._paths = paths
+        self._index: dict[str, Query] | None = None
+
+    def __getitem__(self, name: str) -> Query:
+        return self._queries()[name]
+
+    def __getattr__(self, name: str) -> Query:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        try:
+            return self._queries()[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._queries()
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._queries())
+
+    def __len__(self) -> int:
+        return len(self._queries())
+
+    def _queries(self) -> dict[str, Query]:
+        index = self._index
+        if index is None:
+            index = {}
+            for path in self._paths:
+                for query in _read_queries(path):
+                    if query.name in index:
+                        raise ValueError(f"Duplicate query name {query.name} in {path}")
+                    index[query.name] = query
+            self._index = index
+        return index
+
+
+def load_queries(path: str | os.PathLike) -> Queries:
+    # A .sql file, or a directory of them, with each query preceded by
+    # a -- name: <name> line and using {placeholder} syntax.
+    root = Path(path)
+    if root.is_dir():
+        paths = sorted(root.rglob("*.sql"))
+    elif root.is_file():
+        paths = [root]
+    else:
+        raise FileNotFoundError(path)
+    return Queries(paths)
+
+
+def _read_queries(path: Path) -> Iterator[Query]:
+    raw = path.read_text()
+    matches = list(NAME_RE.finditer(raw))
+    for match_, next_match in zip(matches, matches[1:] + [None]):
+        end = len(raw) if next_match is None else next_match.start()
+        text = COMMENT_RE.sub("", raw[match_.end() : end]).strip()
+        if text == "":
+            raise ValueError(f"Query {match_.group(1)} in {path} is empty")
+        yield Query(match_.group(1), text, str(path))
@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from sql_tstring.dialects import Parameters
+    from sql_tstring.parser import ShapeKey
+
+
+class ParseEvent:
+    __slots__ = ("key", "statements", "placeholders", "duration")
+
+    def __init__(self, key: ShapeKey, statements: int, placeholders: int, duration: float) -> None:
+        self.key = key
+        self.statements = statements
+        self.placeholders = placeholders
+        self.duration = duration
+
+
+class RenderEvent:
+    __slots__ = ("key", "statements", "placeholders", "duration", "query", "values", "arguments")
+
+    def __init__(
+        self,
+        key: ShapeKey,
+        statements: int,
+        placeholders: int,
+        duration: float,
+        query: str,
+        values: Parameters,
+        arguments: list[object],
+    ) -> None:
+        self.key = key
+        self.statements = statements
+        self.placeholders = placeholders
+        self.duration = duration
+        self.query = query
+        self.values = values
+        # The template's interpolated values, in placeholder order
+        self.arguments = arguments
+
+
+class Observer:
+    # Subclasses override the callbacks they are interested in. Parse
+    # callbacks are only made when a shape is parsed (a cache miss).
+
+    def on_parse_start(self, key: ShapeKey) -> None:
+        pass
+
+    def on_parse_end(self, event: ParseEvent) -> None:
+        pass
+
+    def on_render_start(self, key: ShapeKey) -> None:
+        pass
+
+    def on_render_end(self, event: RenderEvent) -> None:
+        pass
+
+
+# Observers for every render, in addition to those on the context
+global_observers: tuple[Observer, ...] = ()
+
+
+def add_observer(observer: Observer) -> None:
+    global global_observers
+
+    global_observers = global_observers + (observer,)
+
+
+def remove_observer(observer: Observer) -> None:
+    global global_observers
+
+    global_observers = tuple(existing for existing in global_observers if existing is not observer)
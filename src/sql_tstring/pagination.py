@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+import base64
+import json
+from datetime import date, datetime, time
+from decimal import Decimal
+from typing import Any, Callable, Sequence
+from uuid import UUID
+
+from sql_tstring import _to_template, get_context, sql, Template
+from sql_tstring.cache import shape_cache
+from sql_tstring.dialects import Parameters
+from sql_tstring.parser import Clause, Shape, template_key
+from sql_tstring.t import Interpolation, Template as TTemplate
+
+# Clauses, as named in CLAUSES, that must follow the seek condition or
+# that conflict with it
+_DISALLOWED_CLAUSES = {
+    "for update",
+    "group by",
+    "having",
+    "limit",
+    "offset",
+    "order by",
+    "union",
+    "union all",
+}
+
+# Cursor values that aren't JSON types are tagged, {"t": tag, "v": text},
+# so that they decode to the same type. Datetime precedes date as it is
+# a subclass.
+_ENCODERS: list[tuple[type, str, Callable[[Any], str]]] = [
+    (datetime, "datetime", datetime.isoformat),
+    (date, "date", date.isoformat),
+    (time, "time", time.isoformat),
+    (Decimal, "decimal", str),
+    (UUID, "uuid", str),
+    (bytes, "bytes", lambda value: base64.b64encode(value).decode()),
+]
+_DECODERS: dict[str, Callable[[str], Any]] = {
+    "datetime": datetime.fromisoformat,
+    "date": date.fromisoformat,
+    "time": time.fromisoformat,
+    "decimal": Decimal,
+    "uuid": UUID,
+    "bytes": lambda text: base64.b64decode(text, validate=True),
+}
+
+
+def paginate(
+    query_or_template: str | Template | TTemplate,
+    values: dict[str, Any] | None = None,
+    *,
+    order_by: Sequence[str],
+    limit: int,
+    cursor: str | None = None,
+    descending: bool = False,
+) -> tuple[str, Parameters]:
+    # Renders a keyset (seek) query, (a, b) > (x, y) rather than an
+    # OFFSET, so that every page after the first has the same query.
+    template = _to_template(query_or_template, values)
+    if len(order_by) == 0:
+        raise ValueError("At least one order by column is required")
+    columns = get_context().columns
+    for column in order_by:
+        if column not in columns:
+            raise ValueError(f"{column} is not valid, must be one of {columns}")
+
+    key, _ = template_key(template)
+    has_where = _check_base(shape_cache.get(key))
+
+    parts: list[str | Any] = list(template)
+    if cursor is not None:
+        seek = decode_cursor(cursor)
+        if len(seek) != len(order_by):
+            raise ValueError("Invalid cursor")
+        parts.append(" AND (" if has_where else " WHERE (")
+        parts.append(", ".join(order_by))
+        parts.append(") < (" if descending else ") > (")
+        for index, value in enumerate(seek):
+            if index > 0:
+                parts.append(", ")
+            parts.append(Interpolation(value))
+        parts.append(")")
+
+    direction = " DESC" if descending else ""
+    parts.append(" ORDER BY " + ", ".join(f"{column}{direction}" for column in order_by))
+    parts.append(" LIMIT ")
+    parts.append(Interpolation(limit))
+    return sql(TTemplate(parts))
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    # The order by values of the last row of a page, which must be JSON
+    # serialisable or one of the tagged types.
+    raw = json.dumps(list(values), default=_encode_value, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> list[Any]:
+    try:
+        values = json.loads(
+            base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)),
+            object_hook=_decode_value,
+        )
+    except (TypeError, ValueError) as error:
+        raise ValueError("Invalid cursor") from error
+    if not isinstance(values, list):
+        raise ValueError("Invalid cursor")
+    return values
+
+
+def _encode_value(value: Any) -> dict[str, str]:
+    for type_, tag, encode in _ENCODERS:
+        if isinstance(value, type_):
+            return {"t": tag, "v": encode(value)}
+    raise TypeError(f"Cursor values of type {type(value).__name__} are not supported")
+
+
+def _decode_value(tagged: dict[str, Any]) -> Any:
+    if tagged.keys() != {"t", "v"} or tagged["t"] not in _DECODERS:
+        raise ValueError("Invalid cursor")
+    return _DECODERS[tagged["t"]](tagged["v"])
+
+
+def _check_base(shape: Shape) -> bool:
+    statements = [statement for statement in shape.statements if len(statement.clauses) > 0]
+    if len(statements) != 1:
+        raise ValueError("Only a single statement can be paginated")
+
+    has_where = False
+    for clause in statements[0].clauses:
+        if not isinstance(clause, Clause):
+            continue
+        text = " ".join(clause.text.lower().split())
+        if text in _DISALLOWED_CLAUSES:
+            raise ValueError(f"The query must not contain a {clause.text} clause")
+        elif text == "where":
+            if any(expression.separator.lower() == "or" for expression in clause.expressions):
+                raise ValueError("The where conditions must be parenthesised if using OR")
+            has_where = True
+    return has_where
@@ -1,10 +1,12 @@
 from __future__ import annotations
 
 import re
-from dataclasses import dataclass, field
 from enum import auto, Enum, unique
-from typing import cast
+from typing import Any, cast, Iterator
 
+from sql_tstring.budget import approximate_bytes, SizedCache
+from sql_tstring.limits import Limits
+from sql_tstring.predicates import Predicate
 from sql_tstring.t import Interpolation as TInterpolation, Template as TTemplate
 
 try:
@@ -34,11 +36,21 @@ class PlaceholderType(Enum):
     VARIABLE_DEFAULT = auto()
 
 
-@dataclass
 class ClauseProperties:
-    allow_empty: bool
-    placeholder_type: PlaceholderType
-    separators: set[str]
+    __slots__ = ("allow_empty", "placeholder_type", "separators")
+
+    def __init__(
+        self, allow_empty: bool, placeholder_type: PlaceholderType, separators: set[str]
+    ) -> None:
+        self.allow_empty = allow_empty
+        self.placeholder_type = placeholder_type
+        self.separators = separators
+
+    def __repr__(self) -> str:
+        return (
+            f"ClauseProperties(allow_empty={self.allow_empty!r}, "
+            f"placeholder_type={self.placeholder_type!r}, separators={self.separators!r})"
+        )
 
 
 type ClauseDictionary = dict[str, "ClauseDictionary" | ClauseProperties]
@@ -282,133 +294,708 @@ OPERATORS: dict[str, dict] = {
 }
 
 
-@dataclass
-class Statement:
-    clauses: list[Clause | Group] = field(default_factory=list)
-    parent: ExpressionGroup | Function | Group | None = None
+class _Node:
+    __slots__: tuple[str, ...] = ()
+
+    def __repr__(self) -> str:
+        # The parent is omitted as it would recurse
+        fields = ", ".join(
+            f"{name}={getattr(self, name)!r}" for name in self.__slots__ if name != "parent"
+        )
+        return f"{type(self).__name__}({fields})"
+
+
+class Statement(_Node):
+    __slots__ = ("clauses", "parent")
+
+    def __init__(
+        self,
+        clauses: list[Clause | Group] | None = None,
+        parent: ExpressionGroup | Function | Group | None = None,
+    ) -> None:
+        self.clauses = clauses if clauses is not None else []
+        self.parent = parent
 
 
-@dataclass
-class Clause:
-    parent: Statement
-    properties: ClauseProperties
-    text: str
-    expressions: list[Expression] = field(init=False)
-    removed: bool = False
+class Clause(_Node):
+    __slots__ = ("parent", "properties", "text", "expressions", "removed")
 
-    def __post_init__(self) -> None:
+    def __init__(
+        self, parent: Statement, properties: ClauseProperties, text: str, removed: bool = False
+    ) -> None:
+        self.parent = parent
+        self.properties = properties
+        self.text = text
+        self.expressions = [Expression(self)]
+        self.removed = removed
+
+
+class Expression(_Node):
+    __slots__ = ("parent", "parts", "removed", "separator")
+
+    def __init__(
+        self,
+        parent: Clause | ExpressionGroup,
+        parts: (
+            list[
+                ExpressionGroup
+                | Function
+                | Group
+                | Operator
+                | Part
+                | Placeholder
+                | Statement
+                | Literal
+            ]
+            | None
+        ) = None,
+        removed: bool = False,
+        separator: str = "",
+    ) -> None:
+        self.parent = parent
+        self.parts = parts if parts is not None else []
+        self.removed = removed
+        self.separator = separator
+
+
+class Part(_Node):
+    __slots__ = ("parent", "text")
+
+    def __init__(self, parent: Expression | Function | Group | Literal, text: str) -> None:
+        self.parent = parent
+        self.text = text
+
+
+class Placeholder(_Node):
+    __slots__ = ("parent", "value")
+
+    def __init__(self, parent: Expression | Function | Group | Literal, value: object) -> None:
+        self.parent = parent
+        self.value = value
+
+
+class Group(_Node):
+    __slots__ = ("parent", "parts")
+
+    def __init__(
+        self,
+        parent: Expression | Function | Group | Statement,
+        parts: (
+            list[Function | Group | Literal | Operator | Part | Placeholder | Statement] | None
+        ) = None,
+    ) -> None:
+        self.parent = parent
+        self.parts = parts if parts is not None else []
+
+
+class ExpressionGroup(_Node):
+    __slots__ = ("parent", "expressions")
+
+    def __init__(self, parent: Expression) -> None:
+        self.parent = parent
         self.expressions = [Expression(self)]
 
 
-@dataclass
-class Expression:
-    parent: Clause | ExpressionGroup
-    parts: list[
-        ExpressionGroup | Function | Group | Operator | Part | Placeholder | Statement | Literal
-    ] = field(default_factory=list)
-    removed: bool = False
-    separator: str = ""
+class Function(_Node):
+    __slots__ = ("name", "parent", "parts")
 
+    def __init__(
+        self,
+        name: str,
+        parent: Expression | Function | Group,
+        parts: (
+            list[Function | Group | Literal | Operator | Part | Placeholder | Statement] | None
+        ) = None,
+    ) -> None:
+        self.name = name
+        self.parent = parent
+        self.parts = parts if parts is not None else []
 
-@dataclass
-class Part:
-    parent: Expression | Function | Group | Literal
-    text: str
 
+class Literal(_Node):
+    __slots__ = ("parent", "parts")
 
-@dataclass
-class Placeholder:
-    parent: Expression | Function | Group | Literal
-    value: object
+    def __init__(
+        self,
+        parent: Expression | Function | Group,
+        parts: list[Operator | Part | Placeholder] | None = None,
+    ) -> None:
+        self.parent = parent
+        self.parts = parts if parts is not None else []
 
 
-@dataclass
-class Group:
-    parent: Expression | Function | Group | Statement
-    parts: list[Function | Group | Literal | Operator | Part | Placeholder | Statement] = field(
-        default_factory=list
-    )
+class Operator(_Node):
+    __slots__ = ("parent", "text")
 
+    def __init__(self, parent: Expression | Function | Group | Literal, text: str) -> None:
+        self.parent = parent
+        self.text = text
 
-@dataclass
-class ExpressionGroup:
-    parent: Expression
-    expressions: list[Expression] = field(init=False)
 
-    def __post_init__(self) -> None:
-        self.expressions = [Expression(self)]
+type ParentNode = Clause | Expression | ExpressionGroup | Function | Group
+type Node = ParentNode | Literal | Statement
+type Element = Node | Operator | Part | Placeholder
 
+# The static structure of a template, the strings with None in place
+# of each interpolation and a nested key for each nested template or
+# predicate.
+type ShapeKey = tuple[str | None | ShapeKey | PredicateKey, ...]
 
-@dataclass
-class Function:
-    name: str
-    parent: Expression | Function | Group
-    parts: list[Function | Group | Literal | Operator | Part | Placeholder | Statement] = field(
-        default_factory=list
-    )
 
+class PredicateKey:
+    # The structure of a combined predicate, with the key of each
+    # template predicate. This isn't a tuple so that it can't be equal
+    # to the key of a nested template.
+    __slots__ = ("operator", "operands")
 
-@dataclass
-class Literal:
-    parent: Expression | Function | Group
-    parts: list[Operator | Part | Placeholder] = field(default_factory=list)
+    def __init__(self, operator: str, operands: tuple[PredicateKey | ShapeKey, ...]) -> None:
+        self.operator = operator
+        self.operands = operands
 
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, PredicateKey):
+            return NotImplemented
+        return self.operator == other.operator and self.operands == other.operands
 
-@dataclass
-class Operator:
-    parent: Expression | Function | Group | Literal
-    text: str
+    def __hash__(self) -> int:
+        return hash((PredicateKey, self.operator, self.operands))
 
+    def __repr__(self) -> str:
+        return f"PredicateKey({self.operator!r}, {self.operands!r})"
 
-type ParentNode = Clause | Expression | ExpressionGroup | Function | Group
-type Node = ParentNode | Literal | Statement
-type Element = Node | Operator | Part | Placeholder
+
+@unique
+class QueryKind(Enum):
+    READ = auto()
+    LOCKING_READ = auto()
+    WRITE = auto()
+
+
+_WRITE_CLAUSES = {"delete from", "do update set", "insert into", "update"}
+
+# Bump whenever the Shape structure changes, so that persisted shapes
+# are invalidated.
+SHAPE_FORMAT = 9
+
+# A predicate restricting a column to the values of the given
+# placeholder slots, where the flag marks a slot holding a sequence of
+# values (IN {values} or = ANY({values})).
+type ShardPredicate = list[tuple[int, bool]]
+
+
+_PLAIN_TYPES = {
+    PlaceholderType.VARIABLE,
+    PlaceholderType.VARIABLE_CONDITION,
+    PlaceholderType.VARIABLE_DEFAULT,
+}
+
+
+class Variant:
+    # The rendered text of a plain shape for a dialect, with the slot
+    # of each value in the order they are emitted. Variants are not
+    # changed once made, bar encoding the text on first use.
+    __slots__ = ("text", "slots", "encoded")
+
+    def __init__(self, text: str, slots: tuple[int, ...]) -> None:
+        self.text = text
+        self.slots = slots
+        self.encoded: bytes | None = None
+
+    def encode(self) -> bytes:
+        encoded = self.encoded
+        if encoded is None:
+            encoded = self.encoded = self.text.encode()
+        return encoded
+
+
+class Shape:
+    __slots__ = (
+        "statements",
+        "placeholders",
+        "depth",
+        "key",
+        "kind",
+        "lock_slots",
+        "plain",
+        "shard_predicates",
+        "variants",
+    )
+
+    def __init__(
+        self,
+        statements: list[Statement],
+        placeholders: list[Placeholder],
+        key: ShapeKey = (),
+        limits: Limits | None = None,
+    ) -> None:
+        self.statements = statements
+        self.placeholders = placeholders
+        # The deepest nesting of groups, functions and statements,
+        # checked first as the other passes over the tree recurse.
+        self.depth = _depth(statements)
+        if limits is not None:
+            limits.check_depth(self.depth)
+        # The key the shape was parsed from, so that memory added to
+        # it later (e.g. variants) can be accounted in the cache.
+        self.key = key
+        # Whether every placeholder is a variable, in which case the
+        # text is the same for all values bar the rewriting values and
+        # so is rendered once per dialect into variants.
+        self.plain = all(
+            not isinstance(placeholder.parent, Literal)
+            and placeholder_type(placeholder) in _PLAIN_TYPES
+            and row_columns(placeholder) is None
+            for placeholder in placeholders
+        )
+        self.variants: dict[Any, Variant] = {}
+        # The placeholder slots within each lock clause
+        self.kind, self.lock_slots = _classify(statements, placeholders)
+        # By (lowercase, unquoted) column name, found whilst parsing so
+        # that the cached shape isn't changed later.
+        self.shard_predicates = _find_shard_predicates(statements, placeholders)
+
+    def __getstate__(self) -> dict[str, object]:
+        # The variants are keyed by Dialect object, so aren't persisted
+        state = {name: getattr(self, name) for name in self.__slots__}
+        state["variants"] = {}
+        return state
+
+    def __setstate__(self, state: dict[str, object]) -> None:
+        for name, value in state.items():
+            setattr(self, name, value)
+
+    def bind(
+        self, values: list[object], start: int = 0, stop: int | None = None
+    ) -> list[Statement]:
+        # The cached tree is shared, so each render works on a copy
+        values_by_id = {
+            id(placeholder): value for placeholder, value in zip(self.placeholders, values)
+        }
+        return [
+            cast(Statement, _copy_node(statement, None, values_by_id))
+            for statement in self.statements[start:stop]
+        ]
 
 
 def parse(template: Template | TTemplate) -> list[Statement]:
+    key, values = template_key(template)
+    shape = parse_shape(key)
+    for placeholder, value in zip(shape.placeholders, values):
+        placeholder.value = value
+    return shape.statements
+
+
+def template_key(
+    template: Template | TTemplate, limits: Limits | None = None
+) -> tuple[ShapeKey, list[object]]:
+    # The limits are checked as the key is built, so that oversized
+    # templates are rejected without reading all of them.
+    values: list[object] = []
+    return _template_key(template, values, limits, 1), values
+
+
+def parse_shape(key: ShapeKey, limits: Limits | None = None) -> Shape:
     statements = [Statement()]
-    current_node: Node = statements[0]
-    _parse_template(template, current_node, statements)
-    return statements
+    placeholders: list[Placeholder] = []
+    _parse_key(key, statements[0], statements, placeholders, limits)
+    return Shape(statements=statements, placeholders=placeholders, key=key, limits=limits)
 
 
-def _parse_template(
-    template: Template | TTemplate, current_node: Node, statements: list[Statement]
-) -> None:
+def placeholder_type(placeholder: Placeholder) -> PlaceholderType:
+    # Placeholders within functions are always variables
+    clause_or_function = _find_node(placeholder.parent, (Clause, Function))
+    if isinstance(clause_or_function, Clause):
+        return clause_or_function.properties.placeholder_type
+    else:
+        return PlaceholderType.VARIABLE
+
+
+def row_columns(placeholder: Placeholder) -> list[str] | None:
+    # The columns of a row value compared with the placeholder by IN
+    # or NOT IN, e.g. (a, b) IN {rows}, otherwise None.
+    parent = placeholder.parent
+    if not isinstance(parent, Expression):
+        return None
+
+    parts = parent.parts[: next(i for i, part in enumerate(parent.parts) if part is placeholder)]
+    if len(parts) < 2 or not isinstance(parts[-1], Operator) or parts[-1].text.lower() != "in":
+        return None
+    parts.pop()
+    if isinstance(parts[-1], Operator) and parts[-1].text.lower() == "not":
+        parts.pop()
+    if len(parts) == 0 or not isinstance(parts[-1], ExpressionGroup):
+        return None
+
+    columns = []
+    for expression in parts[-1].expressions:
+        for part in expression.parts:
+            if not isinstance(part, Part):
+                return None
+            elif part.text != ",":
+                columns.append(part.text)
+    return columns if len(columns) > 1 else None
+
+
+def _find_shard_predicates(
+    statements: list[Statement], placeholders: list[Placeholder]
+) -> dict[str, list[ShardPredicate]]:
+    # The top level ANDed predicates in the WHERE clause of a single
+    # statement that restrict a column by equality, IN or = ANY.
+    statements = [statement for statement in statements if len(statement.clauses) > 0]
+    if len(statements) != 1:
+        return {}
+
+    slots = {id(placeholder): slot for slot, placeholder in enumerate(placeholders)}
+    predicates: dict[str, list[ShardPredicate]] = {}
+    for clause in statements[0].clauses:
+        if not isinstance(clause, Clause) or clause.text.lower() != "where":
+            continue
+        if any(expression.separator.lower() == "or" for expression in clause.expressions):
+            return {}
+        for expression in clause.expressions:
+            found = _shard_predicate(expression.parts, slots)
+            if found is not None:
+                column, predicate = found
+                predicates.setdefault(column, []).append(predicate)
+    return predicates
+
+
+def _shard_predicate(parts: list, slots: dict[int, int]) -> tuple[str, ShardPredicate] | None:
+    if len(parts) != 3 or not isinstance(parts[1], Operator):
+        return None
+
+    operator = parts[1].text.lower()
+    left, right = parts[0], parts[2]
+    if operator == "=" and isinstance(left, Placeholder):
+        left, right = right, left
+    if not isinstance(left, Part):
+        return None
+
+    column = left.text.lower().replace('"', "").split(".")[-1]
+    if operator == "=" and isinstance(right, Placeholder):
+        return column, [(slots[id(right)], False)]
+    elif operator == "=" and isinstance(right, Function) and right.name.lower() == "any":
+        if len(right.parts) == 1 and isinstance(right.parts[0], Placeholder):
+            return column, [(slots[id(right.parts[0])], True)]
+    elif operator == "in" and isinstance(right, Placeholder):
+        return column, [(slots[id(right)], True)]
+    elif operator == "in" and isinstance(right, Group):
+        values = [part for part in right.parts if not (isinstance(part, Part) and part.text == ",")]
+        if all(isinstance(value, Placeholder) for value in values):
+            return column, [(slots[id(value)], False) for value in values]
+    return None
+
+
+def _classify(
+    statements: list[Statement], placeholders: list[Placeholder]
+) -> tuple[QueryKind, list[list[int]]]:
+    slots: dict[int, int] = {id(placeholder): slot for slot, placeholder in enumerate(placeholders)}
+    kind = QueryKind.READ
+    lock_slots: list[list[int]] = []
+    for clause in _clauses(statements):
+        text = " ".join(clause.text.lower().split())
+        if text in _WRITE_CLAUSES:
+            kind = QueryKind.WRITE
+        elif text == "for update":
+            if kind == QueryKind.READ:
+                kind = QueryKind.LOCKING_READ
+            lock_slots.append(
+                [
+                    slots[id(part)]
+                    for expression in clause.expressions
+                    for part in expression.parts
+                    if isinstance(part, Placeholder)
+                ]
+            )
+    return kind, lock_slots
+
+
+def _depth(statements: list[Statement]) -> int:
+    # Iterative, so that deeply nested queries are measured (and then
+    # rejected by the limits) rather than exceeding the recursion limit.
+    result = 0
+    stack: list[tuple[Element, int]] = [(statement, 0) for statement in statements]
+    while len(stack) > 0:
+        node, depth = stack.pop()
+        children: list
+        match node:
+            case Statement():
+                depth += 1
+                children = node.clauses
+            case Clause():
+                children = node.expressions
+            case Expression() | Literal():
+                children = node.parts
+            case Function() | Group():
+                depth += 1
+                children = node.parts
+            case ExpressionGroup():
+                depth += 1
+                children = node.expressions
+            case _:
+                continue
+        result = max(result, depth)
+        stack.extend((child, depth) for child in children)
+    return result
+
+
+def _node_depth(node: Element) -> int:
+    # The depth of the node as measured by _depth
+    depth = 0
+    current: Element | None = node
+    while current is not None:
+        if isinstance(current, (ExpressionGroup, Function, Group, Statement)):
+            depth += 1
+        current = current.parent
+    return depth
+
+
+def _clauses(nodes: list) -> Iterator[Clause]:
+    # All the clauses, including those in sub-queries and CTEs
+    for node in nodes:
+        match node:
+            case Statement():
+                yield from _clauses(node.clauses)
+            case Clause():
+                yield node
+                yield from _clauses(node.expressions)
+            case Expression() | Function() | Group() | Literal():
+                yield from _clauses(node.parts)
+            case ExpressionGroup():
+                yield from _clauses(node.expressions)
+
+
+def _placeholders(nodes: list) -> Iterator[Placeholder]:
+    for node in nodes:
+        match node:
+            case Placeholder():
+                yield node
+            case Statement():
+                yield from _placeholders(node.clauses)
+            case Clause() | ExpressionGroup():
+                yield from _placeholders(node.expressions)
+            case Expression() | Function() | Group() | Literal():
+                yield from _placeholders(node.parts)
+
+
+def _copy_node(node: Element, parent: Any, values_by_id: dict[int, object]) -> Any:
+    match node:
+        case Statement():
+            new_node = Statement(parent=parent)
+            new_node.clauses = [
+                _copy_node(clause, new_node, values_by_id) for clause in node.clauses
+            ]
+        case Clause():
+            new_node = Clause(
+                parent=parent,
+                properties=node.properties,
+                text=node.text,
+                removed=node.removed,
+            )
+            new_node.expressions = [
+                _copy_node(expression, new_node, values_by_id) for expression in node.expressions
+            ]
+        case ExpressionGroup():
+            new_node = ExpressionGroup(parent=parent)
+            new_node.expressions = [
+                _copy_node(expression, new_node, values_by_id) for expression in node.expressions
+            ]
+        case Expression():
+            new_node = Expression(
+                parent=parent,
+                removed=node.removed,
+                separator=node.separator,
+            )
+            new_node.parts = [_copy_node(part, new_node, values_by_id) for part in node.parts]
+        case Function():
+            new_node = Function(name=node.name, parent=parent)
+            new_node.parts = [_copy_node(part, new_node, values_by_id) for part in node.parts]
+        case Group():
+            new_node = Group(parent=parent)
+            new_node.parts = [_copy_node(part, new_node, values_by_id) for part in node.parts]
+        case Literal():
+            new_node = Literal(parent=parent)
+            new_node.parts = [_copy_node(part, new_node, values_by_id) for part in node.parts]
+        case Operator():
+            new_node = Operator(parent=parent, text=node.text)
+        case Part():
+            new_node = Part(parent=parent, text=node.text)
+        case Placeholder():
+            new_node = Placeholder(parent=parent, value=values_by_id.get(id(node)))
+    return new_node
+
+
+def _template_key(
+    template: Template | TTemplate, values: list[object], limits: Limits | None, depth: int
+) -> ShapeKey:
+    if limits is not None:
+        limits.check_depth(depth)
+    key: list[str | None | ShapeKey | PredicateKey] = []
     for item in template:
         match item:
-            case Interpolation(value, _, _, _):
+            case Interpolation(value, _, _, _) | TInterpolation(value, _, _, _):
                 if isinstance(value, (Template, TTemplate)):
-                    _parse_template(value, current_node, statements)
+                    key.append(_template_key(value, values, limits, depth + 1))
+                elif isinstance(value, Predicate):
+                    key.append(_predicate_key(value, values, limits, depth + 1))
                 else:
-                    _parse_placeholder(current_node, value)
-            case TInterpolation(value, _, _, _):
-                if isinstance(value, (Template, TTemplate)):
-                    _parse_template(value, current_node, statements)
-                else:
-                    _parse_placeholder(current_node, value)
+                    key.append(None)
+                    values.append(value)
+                    if limits is not None:
+                        limits.check_placeholders(len(values))
             case str() as raw:
-                current_node = _parse_string(raw, current_node, statements)
+                key.append(raw)
+    return tuple(key)
+
+
+def _predicate_key(
+    predicate: Predicate, values: list[object], limits: Limits | None, depth: int
+) -> PredicateKey:
+    if limits is not None:
+        limits.check_depth(depth)
+    if predicate.operator is None:
+        return PredicateKey(
+            "AND", (_template_key(cast(TTemplate, predicate.template), values, limits, depth + 1),)
+        )
+
+    # Chains of the same operator, e.g. a & b & c, are flattened
+    operands: list[PredicateKey | ShapeKey] = []
+    stack = [predicate]
+    while len(stack) > 0:
+        operand = stack.pop()
+        if operand.operator == predicate.operator:
+            stack.extend(reversed(operand.operands))
+        elif operand.operator is None:
+            operands.append(
+                _template_key(cast(TTemplate, operand.template), values, limits, depth + 1)
+            )
+        else:
+            operands.append(_predicate_key(operand, values, limits, depth + 1))
+    return PredicateKey(predicate.operator, tuple(operands))
 
 
-def _parse_placeholder(
+def _parse_key(
+    key: ShapeKey,
     current_node: Node,
-    value: object,
+    statements: list[Statement],
+    placeholders: list[Placeholder],
+    limits: Limits | None = None,
 ) -> None:
+    for item in key:
+        if item is None:
+            placeholders.append(_parse_placeholder(current_node))
+        elif isinstance(item, PredicateKey):
+            _parse_predicate(item, current_node, placeholders)
+        elif isinstance(item, tuple):
+            _parse_key(item, current_node, statements, placeholders, limits)
+        else:
+            current_node = _parse_string(item, current_node, statements, limits)
+
+
+# The parsed template predicates by clause properties and key, so that
+# each is tokenized once however it is combined.
+fragment_cache: SizedCache[tuple[ClauseProperties, ShapeKey], tuple[Clause, list[Placeholder]]] = (
+    SizedCache("fragments", maxsize=4096)
+)
+
+
+def _parse_predicate(
+    key: PredicateKey, current_node: Node, placeholders: list[Placeholder]
+) -> None:
+    # The predicate is spliced in as an expression group, built from
+    # copies of the parsed template predicates.
+    if isinstance(current_node, Expression):
+        parent = current_node
+    elif isinstance(current_node, (Clause, ExpressionGroup)):
+        parent = current_node.expressions[-1]
+    else:
+        raise ValueError("Invalid syntax")
+
+    clause = _find_node(parent, Clause)
+    if clause.properties.placeholder_type != PlaceholderType.VARIABLE_CONDITION:
+        raise ValueError("Predicates can only be used in where or having clauses")
+    parent.parts.append(_predicate_group(key, parent, clause.properties, placeholders))
+
+
+def _predicate_group(
+    key: PredicateKey,
+    parent: Expression,
+    properties: ClauseProperties,
+    placeholders: list[Placeholder],
+) -> ExpressionGroup:
+    group = ExpressionGroup(parent=parent)
+    group.expressions = []
+    for operand in key.operands:
+        separator = key.operator if len(group.expressions) > 0 else ""
+        if isinstance(operand, PredicateKey):
+            expression = Expression(parent=group, separator=separator)
+            expression.parts.append(_predicate_group(operand, expression, properties, placeholders))
+            group.expressions.append(expression)
+            continue
+
+        fragment, fragment_placeholders = _parse_fragment(operand, properties)
+        # The copied placeholders are given their slot as a value, so
+        # that they can be appended in the parsed order.
+        slots: dict[int, object] = {
+            id(placeholder): slot for slot, placeholder in enumerate(fragment_placeholders)
+        }
+        if len(fragment.expressions) == 1:
+            expression = _copy_node(fragment.expressions[0], group, slots)
+            expression.separator = separator
+        else:
+            expression = Expression(parent=group, separator=separator)
+            inner = ExpressionGroup(parent=expression)
+            inner.expressions = [
+                _copy_node(expression_, inner, slots) for expression_ in fragment.expressions
+            ]
+            expression.parts.append(inner)
+        copied = sorted(
+            _placeholders([expression]), key=lambda placeholder: cast(int, placeholder.value)
+        )
+        for placeholder in copied:
+            placeholder.value = None
+        placeholders.extend(copied)
+        group.expressions.append(expression)
+    return group
+
+
+def _parse_fragment(
+    key: ShapeKey, properties: ClauseProperties
+) -> tuple[Clause, list[Placeholder]]:
+    fragment = fragment_cache.lookup((properties, key))
+    if fragment is not None:
+        return fragment
+
+    statement = Statement()
+    clause = Clause(parent=statement, properties=properties, text="")
+    statement.clauses.append(clause)
+    statements = [statement]
+    placeholders: list[Placeholder] = []
+    _parse_key(key, clause, statements, placeholders)
+    if len(statements) != 1 or statement.clauses != [clause]:
+        raise ValueError("Predicates must be a condition")
+
+    fragment = (clause, placeholders)
+    return fragment_cache.insert((properties, key), fragment, approximate_bytes((key, fragment)))
+
+
+def _parse_placeholder(current_node: Node) -> Placeholder:
     if isinstance(current_node, (Expression, Function, Group, Literal)):
         parent = current_node
     elif isinstance(current_node, Statement):
         raise ValueError("Invalid syntax")
     else:  # Clause | ExpressionGroup
         parent = current_node.expressions[-1]
-    placeholder = Placeholder(parent=parent, value=value)
+    placeholder = Placeholder(parent=parent, value=None)
     parent.parts.append(placeholder)
+    return placeholder
 
 
 def _parse_string(
     raw: str,
     current_node: Node,
     statements: list[Statement],
+    limits: Limits | None = None,
 ) -> Node:
     tokens = []
     for part in SPLIT_RE.split(raw):
@@ -422,6 +1009,7 @@ def _parse_string(
     while index < len(tokens):
         raw_current_token = tokens[index]
         current_token = raw_current_token.lower()
+        previous_node = current_node
 
         consumed = 1
         if isinstance(current_node, Literal):
@@ -486,6 +1074,10 @@ def _parse_string(
             )
 
         index += consumed
+        if limits is not None and current_node is not previous_node:
+            # Checked as each node is entered, so that deeply nested
+            # queries are rejected in time proportional to the limit.
+            limits.check_depth(_node_depth(current_node))
 
     return current_node
 
@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+import ast
+import gc
+import json
+import os
+from collections import defaultdict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, Iterator, TYPE_CHECKING
+
+from sql_tstring import _render_variant
+from sql_tstring.cache import fingerprint, shape_cache, ShapeCache
+from sql_tstring.dialects import Dialect, DialectName, get_dialect
+from sql_tstring.parser import parse, ShapeKey, template_key
+from sql_tstring.t import Interpolation, t, Template
+
+if TYPE_CHECKING:
+    from string.templatelib import Template as StringTemplate
+
+
+@dataclass
+class FoundQuery:
+    path: str
+    line: int
+    key: ShapeKey
+    error: str | None = None
+
+
+def scan(paths: list[str | os.PathLike]) -> list[FoundQuery]:
+    found = []
+    for path in _python_files(paths):
+        try:
+            tree = ast.parse(path.read_bytes(), filename=str(path))
+        except SyntaxError as error:
+            found.append(
+                FoundQuery(path=str(path), line=error.lineno or 0, key=(), error=str(error))
+            )
+            continue
+
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Call) and _is_sql_call(node):
+                static = _static_template(node)
+                if static is not None:
+                    template, opaque = static
+                    query = _parse(str(path), node.lineno, template)
+                    # An opaque interpolation may be a template or
+                    # predicate, e.g. a leading {cte}, and so the query
+                    # can't be known statically if it doesn't parse
+                    # with a placeholder in its place.
+                    if query.error is None or not opaque:
+                        found.append(query)
+    return found
+
+
+def write_manifest(path: str | os.PathLike, found: list[FoundQuery]) -> None:
+    manifest = {
+        "fingerprint": fingerprint(),
+        "queries": [
+            {"path": query.path, "line": query.line, "key": query.key}
+            for query in found
+            if query.error is None
+        ],
+    }
+    Path(path).write_text(json.dumps(manifest, indent=2))
+
+
+def load_manifest(path: str | os.PathLike, cache: ShapeCache | None = None) -> int:
+    if cache is None:
+        cache = shape_cache
+    manifest = json.loads(Path(path).read_text())
+    keys = {_key_from_json(query["key"]) for query in manifest["queries"]}
+    for key in keys:
+        cache.get(key)
+    return len(keys)
+
+
+def warm(
+    queries: Iterable[ShapeKey | Template | StringTemplate],
+    *,
+    dialects: Iterable[DialectName | Dialect] = ("sql",),
+    cache: ShapeCache | None = None,
+    freeze: bool = True,
+) -> int:
+    # Parses each query (a template or shape key, e.g. from scan) and
+    # renders the variants of plain shapes for each dialect, so that
+    # pre-fork server children share the warmed structures copy on
+    # write. Rendering a warmed plain shape only touches the shape and
+    # its variant, rather than copying the tree, so few pages are
+    # dirtied by reference counting. Freezing moves every object into
+    # the permanent generation so that the collector doesn't touch
+    # them either, and so warming should be the last step before
+    # forking.
+    if cache is None:
+        cache = shape_cache
+    resolved = [get_dialect(dialect) for dialect in dialects]
+    keys = {query if isinstance(query, tuple) else template_key(query)[0] for query in queries}
+    shapes = [cache.get(key) for key in keys]
+    for shape in shapes:
+        if shape.plain:
+            for dialect in resolved:
+                if dialect not in shape.variants:
+                    _render_variant(shape, dialect, cache)
+    if freeze:
+        gc.collect()
+        gc.freeze()
+    return len(keys)
+
+
+def _python_files(paths: list[str | os.PathLike]) -> Iterator[Path]:
+    for raw_path in paths:
+        path = Path(raw_path)
+        if path.is_dir():
+            yield from sorted(path.rglob("*.py"))
+        else:
+            yield path
+
+
+def _is_sql_call(node: ast.Call) -> bool:
+    match node.func:
+        case ast.Name(id="sql") | ast.Attribute(attr="sql"):
+            return len(node.args) > 0
+        case _:
+            return False
+
+
+def _static_template(node: ast.Call) -> tuple[Template, bool] | None:
+    # The template and whether it has opaque interpolations
+    argument = node.args[0]
+    if isinstance(argument, ast.Constant) and isinstance(argument.value, str):
+        if len(node.args) == 2:
+            # Values are irrelevant to the shape, so every name maps to None
+            return t(argument.value, defaultdict(lambda: None)), False
+    elif type(argument).__name__ == "TemplateStr":
+        return _template_str(argument)
+    return None
+
+
+def _template_str(node: ast.expr) -> tuple[Template, bool]:
+    # Literal nested t-strings are known statically, whereas other
+    # interpolations are opaque and treated as placeholders. Empty
+    # strings are skipped, as they are when iterating a template, so
+    # that the key matches the one built at runtime.
+    parts: list[str | Interpolation] = []
+    opaque = False
+    for value in node.values:  # type: ignore[attr-defined]
+        if isinstance(value, ast.Constant) and isinstance(value.value, str):
+            if value.value != "":
+                parts.append(value.value)
+        elif type(value.value).__name__ == "TemplateStr":
+            nested, nested_opaque = _template_str(value.value)
+            parts.append(Interpolation(nested))
+            opaque = opaque or nested_opaque
+        else:
+            parts.append(Interpolation(None))
+            opaque = True
+    return Template(parts), opaque
+
+
+def _parse(path: str, line: int, template: Template) -> FoundQuery:
+    key, _ = template_key(template)
+    try:
+        parse(template)
+    except Exception as error:
+        return FoundQuery(path=path, line=line, key=key, error=f"{type(error).__name__}: {error}")
+    else:
+        return FoundQuery(path=path, line=line, key=key)
+
+
+def _key_from_json(raw: list) -> ShapeKey:
+    return tuple(_key_from_json(item) if isinstance(item, list) else item for item in raw)
@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+from typing import Any
+
+from sql_tstring.t import t, Template as TTemplate
+
+try:
+    from string.templatelib import Template
+except ImportError:
+
+    class Template:  # type: ignore[no-redef]
+        pass
+
+
+class Predicate:
+    # A condition for a where or having clause, either a template or
+    # the AND or OR of other predicates. Combining is constant time,
+    # the structure is flattened when the template key is built.
+    __slots__ = ("operator", "operands", "template")
+
+    operator: str | None
+    operands: tuple[Predicate, ...]
+    template: Template | TTemplate | None
+
+    def __init__(
+        self, query_or_template: str | Template | TTemplate, values: dict[str, Any] | None = None
+    ) -> None:
+        if isinstance(query_or_template, (Template, TTemplate)) and values is None:
+            self.template = query_or_template
+        elif isinstance(query_or_template, str) and values is not None:
+            self.template = t(query_or_template, values)
+        else:
+            raise ValueError("Must call with a template, or a query string and values")
+        self.operator = None
+        self.operands = ()
+
+    def __and__(self, other: Predicate) -> Predicate:
+        if not isinstance(other, Predicate):
+            return NotImplemented
+        return _combine("AND", self, other)
+
+    def __or__(self, other: Predicate) -> Predicate:
+        if not isinstance(other, Predicate):
+            return NotImplemented
+        return _combine("OR", self, other)
+
+    def __repr__(self) -> str:
+        if self.operator is None:
+            return f"Predicate({self.template!r})"
+        else:
+            return f"Predicate({self.operator}, {self.operands!r})"
+
+
+def _combine(operator: str, *operands: Predicate) -> Predicate:
+    predicate = object.__new__(Predicate)
+    predicate.operator = operator
+    predicate.operands = operands
+    predicate.template = None
+    return predicate
@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+from typing import Literal
+
+from sql_tstring.observers import add_observer, Observer, remove_observer, RenderEvent
+from sql_tstring.parser import PredicateKey, ShapeKey
+
+type OrderBy = Literal["renders", "total_time", "p99_time", "mean_values", "mean_length"]
+
+
+class ShapeStats:
+    __slots__ = ("key", "renders", "total_time", "p99_time", "mean_values", "mean_length")
+
+    def __init__(
+        self,
+        key: ShapeKey,
+        renders: int,
+        total_time: float,
+        p99_time: float,
+        mean_values: float,
+        mean_length: float,
+    ) -> None:
+        self.key = key
+        self.renders = renders
+        self.total_time = total_time
+        self.p99_time = p99_time
+        self.mean_values = mean_values
+        self.mean_length = mean_length
+
+    @property
+    def query(self) -> str:
+        return describe(self.key)
+
+    def __repr__(self) -> str:
+        return (
+            f"ShapeStats(query={self.query!r}, renders={self.renders}, "
+            f"total_time={self.total_time:.6f}, p99_time={self.p99_time:.6f}, "
+            f"mean_values={self.mean_values:.1f}, mean_length={self.mean_length:.1f})"
+        )
+
+
+class _Accumulator:
+    __slots__ = ("renders", "total_time", "total_values", "total_length", "times")
+
+    def __init__(self) -> None:
+        self.renders = 0
+        self.total_time = 0.0
+        self.total_values = 0
+        self.total_length = 0
+        # A ring buffer of the most recent render times, for the p99
+        self.times: list[float] = []
+
+
+class StatsRegistry(Observer):
+    def __init__(self, samples: int = 1000) -> None:
+        import threading
+
+        self.samples = samples
+        self._lock = threading.Lock()
+        self._shapes: dict[ShapeKey, _Accumulator] = {}
+
+    def record(self, key: ShapeKey, duration: float, values: int, length: int) -> None:
+        with self._lock:
+            try:
+                accumulator = self._shapes[key]
+            except KeyError:
+                accumulator = self._shapes[key] = _Accumulator()
+
+            if len(accumulator.times) < self.samples:
+                accumulator.times.append(duration)
+            else:
+                accumulator.times[accumulator.renders % self.samples] = duration
+            accumulator.renders += 1
+            accumulator.total_time += duration
+            accumulator.total_values += values
+            accumulator.total_length += length
+
+    def on_render_end(self, event: RenderEvent) -> None:
+        self.record(event.key, event.duration, len(event.values), len(event.query))
+
+    def reset(self) -> None:
+        with self._lock:
+            self._shapes.clear()
+
+    def snapshot(
+        self, top: int | None = None, order_by: OrderBy = "total_time"
+    ) -> list[ShapeStats]:
+        with self._lock:
+            accumulators = [
+                (
+                    key,
+                    accumulator.renders,
+                    accumulator.total_time,
+                    sorted(accumulator.times),
+                    accumulator.total_values,
+                    accumulator.total_length,
+                )
+                for key, accumulator in self._shapes.items()
+            ]
+
+        results = [
+            ShapeStats(
+                key=key,
+                renders=renders,
+                total_time=total_time,
+                p99_time=times[min(len(times) - 1, int(len(times) * 0.99))],
+                mean_values=total_values / renders,
+                mean_length=total_length / renders,
+            )
+            for key, renders, total_time, times, total_values, total_length in accumulators
+        ]
+        results.sort(key=lambda stats: getattr(stats, order_by), reverse=True)
+        return results[:top]
+
+
+# The registry sql records to, None (the default) disables recording
+registry: StatsRegistry | None = None
+
+
+def enable_stats(samples: int = 1000) -> StatsRegistry:
+    global registry
+
+    disable_stats()
+    registry = StatsRegistry(samples)
+    add_observer(registry)
+    return registry
+
+
+def disable_stats() -> None:
+    global registry
+
+    if registry is not None:
+        remove_observer(registry)
+    registry = None
+
+
+def describe(key: ShapeKey) -> str:
+    return "".join(_describe(item) for item in key)
+
+
+def _describe(item: str | None | ShapeKey | PredicateKey) -> str:
+    if item is None:
+        return "{}"
+    elif isinstance(item, str):
+        return item
+    elif isinstance(item, PredicateKey):
+        return f"({f" {item.operator} ".join(_describe(operand) for operand in item.operands)})"
+    else:
+        return describe(item)
@@ -1,5 +1,7 @@
 import re
-from typing import Any, Iterator
+from typing import Any, Iterator, Mapping
+
+from sql_tstring.budget import approximate_bytes, SizedCache
 
 PLACEHOLDER_RE = re.compile(r"(?<=(?<!\{)\{)[^{}]*(?=\}(?!\}))")
 
@@ -23,16 +25,54 @@ class Template:
 
 
 def t(raw: str, values: dict[str, Any]) -> Template:
-    parts: list[str | Interpolation] = []
+    return split(raw).template(values)
+
+
+class SplitTemplate:
+    __slots__ = ("parts", "names")
+
+    def __init__(self, parts: list[str | None], names: list[str]) -> None:
+        # The parts are the static strings with None for each placeholder
+        self.parts = parts
+        self.names = names
+
+    def template(self, values: Mapping[str, Any]) -> Template:
+        names = iter(self.names)
+        return Template(
+            [
+                Interpolation(value=values[next(names)]) if part is None else part
+                for part in self.parts
+            ]
+        )
+
+
+# Queries are typically static strings, so each is only split once
+split_cache: SizedCache[str, SplitTemplate] = SizedCache("splits", maxsize=4096)
+
+
+def split(raw: str) -> SplitTemplate:
+    split_template = split_cache.lookup(raw)
+    if split_template is None:
+        split_template = _split(raw)
+        split_template = split_cache.insert(
+            raw, split_template, approximate_bytes((raw, split_template))
+        )
+    return split_template
+
+
+def _split(raw: str) -> SplitTemplate:
+    parts: list[str | None] = []
+    names = []
     position = 0
     for match_ in PLACEHOLDER_RE.finditer(raw):
         end = match_.start() - 1
         if position != end:
             parts.append(raw[position:end].replace("{{", "{").replace("}}", "}"))
         position = match_.end() + 1
-        parts.append(Interpolation(value=values[match_.group(0)]))
+        parts.append(None)
+        names.append(match_.group(0))
 
     if position != len(raw):
         parts.append(raw[position:].replace("{{", "{").replace("}}", "}"))
 
-    return Template(parts)
+    return SplitTemplate(parts, names)
@@ -0,0 +1,76 @@
+from dataclasses import astuple, dataclass
+from decimal import Decimal
+from enum import Enum, IntEnum
+
+import pytest
+
+from sql_tstring import Absent, sql, sql_context
+from sql_tstring.adapters import Adapters
+
+
+class Colour(Enum):
+    RED = "red"
+
+
+class Size(IntEnum):
+    LARGE = 3
+
+
+@dataclass
+class Point:
+    x: int
+    y: int
+
+
+def test_adapters() -> None:
+    adapters = Adapters({Enum: lambda value: value.value, Decimal: str, Point: astuple})
+    with sql_context(adapters=adapters):
+        assert sql(
+            "SELECT x FROM y WHERE a = {a} AND b = {b} AND c = {c} AND d = {d} AND e = {e}",
+            {"a": Colour.RED, "b": Size.LARGE, "c": Decimal("1.5"), "d": Point(1, 2), "e": 4},
+        ) == (
+            "SELECT x FROM y WHERE a = ? AND b = ? AND c = ? AND d = ? AND e = ?",
+            ["red", 3, "1.5", (1, 2), 4],
+        )
+
+
+def test_adapters_not_applied_to_identifiers() -> None:
+    adapters = Adapters({str: str.upper})
+    with sql_context(adapters=adapters, columns={"x"}):
+        assert sql("SELECT {col} FROM y WHERE a = {a}", {"col": "x", "a": "b"}) == (
+            "SELECT x FROM y WHERE a = ?",
+            ["B"],
+        )
+
+
+def test_register() -> None:
+    adapters = Adapters()
+    assert adapters.adapt(Colour.RED) is Colour.RED
+    adapters.register(Colour, lambda value: value.name)
+    assert adapters.adapt(Colour.RED) == "RED"
+
+
+@pytest.mark.parametrize(
+    "query, expected",
+    [
+        ("SELECT x FROM y WHERE a = ANY({a})", "SELECT x FROM y WHERE a = ANY(?)"),
+        ("SELECT x FROM y WHERE a IN {a}", "SELECT x FROM y WHERE a IN ?"),
+    ],
+)
+@pytest.mark.parametrize("b", [1, Absent])
+def test_sequence_elements(query: str, expected: str, b: object) -> None:
+    # With b Absent the tree is rendered, rather than the plain variant
+    adapters = Adapters({Enum: lambda value: value.value, Decimal: str})
+    with sql_context(adapters=adapters):
+        query_str, values = sql(query + " AND b = {b}", {"a": [Colour.RED, Decimal("1.5")], "b": b})
+        assert values == [["red", "1.5"]] + ([] if b is Absent else [b])
+        assert query_str.startswith(expected)
+        _, values = sql(query, {"a": (Colour.RED, Size.LARGE)})
+        assert values == [("red", 3)]
+
+
+def test_sequence_adapter() -> None:
+    adapters = Adapters({Enum: lambda value: value.value, list: len})
+    assert adapters.adapt([Colour.RED]) == 1
+    assert adapters.adapt([[Colour.RED]]) == 1
+    assert Adapters({Enum: lambda value: value.value}).adapt([[Colour.RED]]) == [["red"]]
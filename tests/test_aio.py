@@ -0,0 +1,117 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from sql_tstring import sql, sql_context
+from sql_tstring.aio import render_async, render_statements
+from sql_tstring.dialects import Parameters
+from sql_tstring.limits import LimitExceededError, Limits
+from sql_tstring.stats import StatsRegistry
+
+INSERT = "INSERT INTO y (a, b) VALUES ({a}, {b})"
+NESTED = "UPDATE y SET a = {a}; DELETE FROM y WHERE b IN (SELECT b FROM z WHERE c = {b})"
+
+
+def test_render_async_inline() -> None:
+    sql(INSERT, {"a": 1, "b": 2})  # Cached so rendered inline
+    assert asyncio.run(render_async(INSERT, {"a": 1, "b": 2})) == sql(INSERT, {"a": 1, "b": 2})
+
+
+def test_render_async_offloaded() -> None:
+    async def _render() -> tuple[str, Parameters]:
+        with sql_context(dialect="asyncpg"):
+            with ThreadPoolExecutor(1) as executor:
+                return await render_async(INSERT, {"a": 1, "b": 2}, executor=executor, threshold=0)
+
+    assert asyncio.run(_render()) == ("INSERT INTO y (a , b) VALUES ($1 , $2)", [1, 2])
+
+
+def test_render_statements() -> None:
+    async def _render(threshold: int) -> list[tuple[str, Parameters]]:
+        with sql_context(dialect="asyncpg"):
+            return [
+                result
+                async for result in render_statements(
+                    "UPDATE y SET a = {a}; DELETE FROM y WHERE b = {b};",
+                    {"a": 1, "b": 2},
+                    threshold=threshold,
+                    chunksize=1,
+                )
+            ]
+
+    expected = [("UPDATE y SET a = $1", [1]), ("DELETE FROM y WHERE b = $1", [2])]
+    assert asyncio.run(_render(0)) == expected
+    assert asyncio.run(_render(1000)) == expected
+
+
+@pytest.mark.parametrize(
+    "limits",
+    [Limits(max_length=30), Limits(max_values=1), Limits(max_depth=1)],
+)
+def test_render_statements_limits(limits: Limits) -> None:
+    async def _render(threshold: int) -> list[tuple[str, Parameters]]:
+        with sql_context(limits=limits):
+            return [
+                result
+                async for result in render_statements(
+                    NESTED,
+                    {"a": 1, "b": 2},
+                    threshold=threshold,
+                    chunksize=1,
+                )
+            ]
+
+    with pytest.raises(LimitExceededError):
+        asyncio.run(_render(0))
+    with pytest.raises(LimitExceededError):
+        asyncio.run(_render(1000))
+
+
+def test_render_statements_single() -> None:
+    async def _render() -> list[tuple[str, Parameters]]:
+        return [
+            result async for result in render_statements("SELECT a FROM y WHERE b = {b}", {"b": 1})
+        ]
+
+    assert asyncio.run(_render()) == [sql("SELECT a FROM y WHERE b = {b}", {"b": 1})]
+
+
+def test_render_statements_named() -> None:
+    async def _render() -> list[tuple[str, Parameters]]:
+        with sql_context(dialect="named"):
+            return [
+                result
+                async for result in render_statements(
+                    "UPDATE y SET a = {a}; DELETE FROM y WHERE b = {b};", {"a": 1, "b": 2}
+                )
+            ]
+
+    assert asyncio.run(_render()) == [
+        ("UPDATE y SET a = :p1", {"p1": 1}),
+        ("DELETE FROM y WHERE b = :p1", {"p1": 2}),
+    ]
+
+
+def test_render_async_limits() -> None:
+    async def _render(threshold: int) -> tuple[str, Parameters]:
+        with sql_context(limits=Limits(max_placeholders=1)):
+            return await render_async(INSERT, {"a": 1, "b": 2}, threshold=threshold)
+
+    sql(INSERT, {"a": 1, "b": 2})
+    with pytest.raises(LimitExceededError):
+        asyncio.run(_render(0))
+    with pytest.raises(LimitExceededError):
+        asyncio.run(_render(1000))
+
+
+def test_render_async_observed() -> None:
+    stats = StatsRegistry()
+
+    async def _render() -> tuple[str, Parameters]:
+        with sql_context(observers=(stats,)):
+            with ThreadPoolExecutor(1) as executor:
+                return await render_async(INSERT, {"a": 1, "b": 2}, executor=executor, threshold=0)
+
+    assert asyncio.run(_render()) == sql(INSERT, {"a": 1, "b": 2})
+    assert [shape.renders for shape in stats.snapshot()] == [1]
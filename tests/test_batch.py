@@ -0,0 +1,97 @@
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from enum import Enum
+
+import pytest
+
+from sql_tstring import Absent, sql_context
+from sql_tstring.adapters import Adapters
+from sql_tstring.batch import initialize_worker, render_batch, WorkerContext
+from sql_tstring.dialects import Dialect
+
+QUERY = "SELECT x FROM y WHERE a = {a} AND b = {b} ORDER BY {c}"
+ROWS = [{"a": index, "b": Absent if index % 2 else index, "c": "x"} for index in range(50)]
+
+
+def _expected(index: int) -> tuple[str, list]:
+    if index % 2:
+        return ("SELECT x FROM y WHERE a = $1 ORDER BY x", [index])
+    else:
+        return ("SELECT x FROM y WHERE a = $1 AND b = $2 ORDER BY x", [index, index])
+
+
+def test_serial() -> None:
+    with sql_context(columns={"x"}, dialect="asyncpg"):
+        results = list(render_batch(QUERY, ROWS, chunksize=7))
+    assert results == [_expected(index) for index in range(50)]
+
+
+def test_threads() -> None:
+    with sql_context(columns={"x"}, dialect="asyncpg"):
+        with ThreadPoolExecutor(
+            max_workers=4, initializer=initialize_worker, initargs=(WorkerContext(QUERY),)
+        ) as executor:
+            results = list(render_batch(QUERY, ROWS, executor=executor, chunksize=3))
+    assert results == [_expected(index) for index in range(50)]
+
+
+def test_processes() -> None:
+    with sql_context(columns={"x"}, dialect="asyncpg"):
+        with ProcessPoolExecutor(
+            max_workers=2, initializer=initialize_worker, initargs=(WorkerContext(QUERY),)
+        ) as executor:
+            results = list(
+                render_batch(QUERY, ROWS, executor=executor, chunksize=10, max_pending=2)
+            )
+    assert results == [_expected(index) for index in range(50)]
+
+
+def test_multiple_templates() -> None:
+    other = "SELECT x FROM y WHERE b = {b}"
+    with sql_context(columns={"x"}, dialect="asyncpg"):
+        with ThreadPoolExecutor(
+            max_workers=2, initializer=initialize_worker, initargs=(WorkerContext(QUERY, other),)
+        ) as executor:
+            results = list(render_batch(QUERY, ROWS, executor=executor, chunksize=3))
+            assert list(render_batch(other, [{"b": 1}], executor=executor)) == [
+                ("SELECT x FROM y WHERE b = $1", [1])
+            ]
+            with pytest.raises(RuntimeError):
+                list(render_batch("SELECT x FROM y", [{}], executor=executor))
+    assert results == [_expected(index) for index in range(50)]
+
+
+def test_context_captured_eagerly() -> None:
+    with sql_context(columns={"x"}, dialect="asyncpg"):
+        results = render_batch(QUERY, ROWS, chunksize=7)
+    assert list(results) == [_expected(index) for index in range(50)]
+
+
+def test_uninitialized_workers() -> None:
+    with sql_context(columns={"x"}, dialect="asyncpg"):
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            with pytest.raises(RuntimeError):
+                list(render_batch(QUERY, ROWS, executor=executor))
+
+
+def test_adapters_rejected() -> None:
+    with sql_context(adapters=Adapters({Enum: lambda member: member.value})):
+        with pytest.raises(ValueError):
+            WorkerContext(QUERY)
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            with pytest.raises(ValueError):
+                render_batch(QUERY, ROWS, executor=executor)
+
+
+def test_custom_dialect() -> None:
+    dialect = Dialect("custom", "@p{}")
+    with sql_context(columns={"x"}, dialect=dialect):
+        with ProcessPoolExecutor(
+            max_workers=2, initializer=initialize_worker, initargs=(WorkerContext(QUERY),)
+        ) as executor:
+            results = list(render_batch(QUERY, ROWS[:4], executor=executor, chunksize=2))
+    assert results == [
+        ("SELECT x FROM y WHERE a = @p1 AND b = @p2 ORDER BY x", [0, 0]),
+        ("SELECT x FROM y WHERE a = @p1 ORDER BY x", [1]),
+        ("SELECT x FROM y WHERE a = @p1 AND b = @p2 ORDER BY x", [2, 2]),
+        ("SELECT x FROM y WHERE a = @p1 ORDER BY x", [3]),
+    ]
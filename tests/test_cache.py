@@ -0,0 +1,143 @@
+from pathlib import Path
+
+import pytest
+
+from sql_tstring import Absent, cache, IsNull, sql, sql_bytes, sql_context, t
+from sql_tstring.budget import approximate_bytes
+from sql_tstring.cache import ShapeCache
+from sql_tstring.parser import CLAUSES, template_key
+
+
+def test_cached_shape_is_not_mutated() -> None:
+    a = 1
+    b = Absent
+    query = "SELECT x FROM y WHERE a = {a} AND b = {b}"
+    assert ("SELECT x FROM y WHERE a = ?", [1]) == sql(query, locals())
+    b = 2
+    assert ("SELECT x FROM y WHERE a = ? AND b = ?", [1, 2]) == sql(query, locals())
+
+
+def test_shape_key_ignores_values() -> None:
+    key1, values1 = template_key(t("SELECT x FROM y WHERE a = {a}", {"a": 1}))
+    key2, values2 = template_key(t("SELECT x FROM y WHERE a = {a}", {"a": 2}))
+    assert key1 == key2
+    assert values1 == [1]
+    assert values2 == [2]
+
+
+def test_shape_key_nested() -> None:
+    inner = t("b = {b}", {"b": 2})
+    key, values = template_key(t("SELECT x FROM y WHERE a = {a} AND {inner}", locals() | {"a": 1}))
+    assert key == ("SELECT x FROM y WHERE a = ", None, " AND ", ("b = ", None))
+    assert values == [1, 2]
+
+
+def test_cache_maxsize() -> None:
+    shape_cache = ShapeCache(maxsize=1)
+    key1, _ = template_key(t("SELECT x FROM y", {}))
+    key2, _ = template_key(t("SELECT x FROM z", {}))
+    shape_cache.get(key1)
+    shape_cache.get(key2)
+    assert key1 not in shape_cache
+    assert key2 in shape_cache
+
+
+def test_cache_max_bytes() -> None:
+    key1, _ = template_key(t("SELECT x FROM y", {}))
+    key2, _ = template_key(t("SELECT x FROM z", {}))
+    size = approximate_bytes(ShapeCache().get(key1))
+    shape_cache = ShapeCache(max_bytes=size + size // 2)
+    shape_cache.get(key1)
+    assert shape_cache.info().bytes == size
+    shape_cache.get(key2)
+    assert key1 not in shape_cache
+    assert key2 in shape_cache
+    assert shape_cache.info().entries == 1
+
+
+def test_cache_info() -> None:
+    cache.shape_cache.clear()
+    sql("SELECT x FROM y WHERE a = {a}", {"a": 1})
+    shapes, fragments, splits = cache.cache_info()
+    assert (shapes.name, fragments.name, splits.name) == ("shapes", "fragments", "splits")
+    assert shapes.entries == 1
+    assert shapes.bytes > 0
+    assert splits.entries > 0
+
+
+def test_variant_accounted() -> None:
+    cache.shape_cache.clear()
+    query = "SELECT x FROM y WHERE a = {a}"
+    sql(query, {"a": Absent})
+    parsed = cache.shape_cache.info().bytes
+    sql_bytes(query, {"a": 1})
+    assert cache.shape_cache.info().bytes > parsed
+    cache.shape_cache.clear()
+    assert cache.shape_cache.info().bytes == 0
+
+
+def test_dump_load(tmp_path: Path) -> None:
+    source = ShapeCache()
+    key, _ = template_key(t("SELECT x FROM y WHERE a = {a}", {"a": 1}))
+    source.get(key)
+    assert cache.dump(tmp_path, source) == 1
+
+    destination = ShapeCache()
+    assert cache.load(tmp_path, destination) == 1
+    assert key in destination
+    statements = destination.get(key).bind([2])
+    assert statements[0].clauses[2].expressions[0].parts[2].value == 2  # type: ignore
+
+
+def test_dump_load_variants(tmp_path: Path) -> None:
+    query = "SELECT x FROM y WHERE a = {a}"
+    cache.shape_cache.clear()
+    sql(query, {"a": 1})
+    cache.dump(tmp_path)
+    cache.shape_cache.clear()
+    assert cache.load(tmp_path) == 1
+    key, _ = template_key(t(query, {"a": 1}))
+    assert cache.shape_cache.get(key).variants == {}
+    assert sql(query, {"a": 2}) == ("SELECT x FROM y WHERE a = ?", [2])
+    assert len(cache.shape_cache.get(key).variants) == 1
+
+
+def test_directory_write_through(tmp_path: Path) -> None:
+    key, _ = template_key(t("SELECT x FROM y WHERE a = {a}", {"a": 1}))
+    ShapeCache(directory=tmp_path).get(key)
+    assert len(list(tmp_path.rglob("*.pickle"))) == 1
+    destination = ShapeCache()
+    assert cache.load(tmp_path, destination) == 1
+
+
+def test_grammar_change_invalidates(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    source = ShapeCache()
+    key, _ = template_key(t("SELECT x FROM y", {}))
+    source.get(key)
+    cache.dump(tmp_path, source)
+
+    monkeypatch.setitem(CLAUSES, "returning", {})
+    assert cache.load(tmp_path, ShapeCache()) == 0
+
+
+def test_variant_reused() -> None:
+    query = "INSERT INTO y (a, b) VALUES ({a}, {b})"
+    first, values = sql_bytes(query, {"a": 1, "b": 2})
+    second, _ = sql_bytes(query, {"a": 3, "b": 4})
+    assert first == b"INSERT INTO y (a , b) VALUES (? , ?)"
+    assert values == [1, 2]
+    assert first is second
+
+
+@pytest.mark.parametrize("dialect", ["sql", "asyncpg"])
+def test_variant_rewriting_values(dialect: str) -> None:
+    query = "SELECT x FROM y WHERE a = {a} AND b = {b} AND c = {c}"
+    with sql_context(dialect=dialect):  # type: ignore[arg-type]
+        plain = sql(query, {"a": 1, "b": 2, "c": 3})
+        rewritten = sql(query, {"a": 1, "b": Absent, "c": IsNull})
+    if dialect == "sql":
+        assert plain == ("SELECT x FROM y WHERE a = ? AND b = ? AND c = ?", [1, 2, 3])
+        assert rewritten == ("SELECT x FROM y WHERE a = ? AND c IS NULL", [1])
+    else:
+        assert plain == ("SELECT x FROM y WHERE a = $1 AND b = $2 AND c = $3", [1, 2, 3])
+        assert rewritten == ("SELECT x FROM y WHERE a = $1 AND c IS NULL", [1])
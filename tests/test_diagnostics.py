@@ -0,0 +1,74 @@
+import pytest
+
+from sql_tstring import Absent, sql, sql_context
+from sql_tstring.diagnostics import (
+    detect_repeated_renders,
+    RepeatedRender,
+    RepeatedRenderWarning,
+    ShapeExplosionError,
+    ShapeExplosionWarning,
+    ShapeTracker,
+)
+
+
+def test_repeated_render_warning() -> None:
+    with detect_repeated_renders(threshold=3):
+        with pytest.warns(RepeatedRenderWarning) as record:
+            for index in range(10):
+                sql("SELECT x FROM y WHERE a = {a}", {"a": index})
+    assert len(record) == 1
+    assert record[0].filename == __file__
+
+
+def test_repeated_render_callback() -> None:
+    reported: list[RepeatedRender] = []
+    with detect_repeated_renders(threshold=2, callback=reported.append):
+        for index in range(3):
+            sql("SELECT x FROM y WHERE a = {a} AND b = {b}", {"a": index, "b": Absent})
+        sql("SELECT x FROM y WHERE a = {a} AND b = {b}", {"a": 1, "b": 2})
+    assert [(repeated.query, repeated.count) for repeated in reported] == [
+        ("SELECT x FROM y WHERE a = ?", 3)
+    ]
+
+
+def test_outside_scope() -> None:
+    reported: list[RepeatedRender] = []
+    with detect_repeated_renders(threshold=1, callback=reported.append):
+        sql("SELECT x FROM y WHERE a = {a}", {"a": 1})
+    sql("SELECT x FROM y WHERE a = {a}", {"a": 1})
+    assert reported == []
+
+
+def test_shape_explosion_raise() -> None:
+    tracker = ShapeTracker(limit=2, action="raise")
+    query = "SELECT x FROM y WHERE a = {a} AND b = {b} ORDER BY {c}"
+    with sql_context(columns={"x", "y"}, observers=(tracker,)):
+        sql(query, {"a": 1, "b": 1, "c": "x"})
+        sql(query, {"a": 2, "b": 2, "c": "x"})
+        sql(query, {"a": 1, "b": 1, "c": "y"})
+        with pytest.raises(ShapeExplosionError):
+            sql(query, {"a": 1, "b": Absent, "c": "y"})
+    key = ("SELECT x FROM y WHERE a = ", None, " AND b = ", None, " ORDER BY ", None)
+    assert tracker.drivers(key) == [2, 3]
+
+
+def test_shape_explosion_warn() -> None:
+    tracker = ShapeTracker(limit=1)
+    with sql_context(columns={"x", "y"}, observers=(tracker,)):
+        sql("SELECT x FROM y WHERE a = {a} ORDER BY {c}", {"a": 1, "c": "x"})
+        sql("SELECT x FROM y WHERE a = {a} ORDER BY {c}", {"a": 2, "c": "x"})
+        with pytest.warns(ShapeExplosionWarning, match=r"placeholders \[2\]"):
+            sql("SELECT x FROM y WHERE a = {a} ORDER BY {c}", {"a": 3, "c": "y"})
+
+
+def test_shape_explosion_rows() -> None:
+    tracker = ShapeTracker(limit=3, action="raise")
+    query = "SELECT x FROM y WHERE (a, b) IN {rows} AND c = {c}"
+    with sql_context(columns={"a", "b"}, observers=(tracker,)):
+        sql(query, {"rows": [(1, 2)], "c": 1})
+        sql(query, {"rows": [(1, 2), (3, 4)], "c": 2})
+        sql(query, {"rows": [(1, 2), (3, 4), (5, 6)], "c": 3})
+        with pytest.raises(ShapeExplosionError):
+            sql(query, {"rows": [(index, index) for index in range(5)], "c": 4})
+    key = ("SELECT x FROM y WHERE (a, b) IN ", None, " AND c = ", None)
+    assert tracker.drivers(key) == [1]
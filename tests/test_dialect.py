@@ -1,4 +1,9 @@
+import sqlite3
+
+import pytest
+
 from sql_tstring import RewritingValue, sql, sql_context
+from sql_tstring.dialects import Dialect, DialectName, Parameters
 
 
 def test_asyncpg() -> None:
@@ -9,3 +14,64 @@ def test_asyncpg() -> None:
         assert ("SELECT x FROM y WHERE a = $1 AND c = $2", [1, 2]) == sql(
             "SELECT x FROM y WHERE a = {a} AND b = {b} AND c = {c}", locals()
         )
+
+
+@pytest.mark.parametrize(
+    "dialect, expected, expected_values",
+    [
+        ("sql", "SELECT x FROM y WHERE a = ? AND c = ?", [1, 2]),
+        ("asyncpg", "SELECT x FROM y WHERE a = $1 AND c = $2", [1, 2]),
+        ("format", "SELECT x FROM y WHERE a = %s AND c = %s", [1, 2]),
+        ("named", "SELECT x FROM y WHERE a = :p1 AND c = :p2", {"p1": 1, "p2": 2}),
+        ("numeric", "SELECT x FROM y WHERE a = :1 AND c = :2", [1, 2]),
+        (Dialect("custom", "@p{}"), "SELECT x FROM y WHERE a = @p1 AND c = @p2", [1, 2]),
+    ],
+)
+def test_dialects(
+    dialect: DialectName | Dialect, expected: str, expected_values: Parameters
+) -> None:
+    with sql_context(dialect=dialect):
+        assert (expected, expected_values) == sql(
+            "SELECT x FROM y WHERE a = {a} AND c = {c}", {"a": 1, "c": 2}
+        )
+        # The rendered tree, rather than the plain variant
+        assert (expected, expected_values) == sql(
+            "SELECT x FROM y WHERE a = {a} AND b = {b} AND c = {c}",
+            {"a": 1, "b": RewritingValue.ABSENT, "c": 2},
+        )
+
+
+@pytest.mark.filterwarnings("error")
+@pytest.mark.parametrize("dialect", ["sql", "named"])
+def test_sqlite(dialect: DialectName) -> None:
+    connection = sqlite3.connect(":memory:")
+    connection.execute("CREATE TABLE y (a INTEGER, b TEXT)")
+    connection.executemany("INSERT INTO y VALUES (?, ?)", [(1, "x"), (2, "y"), (3, "z")])
+    with sql_context(dialect=dialect):
+        query, values = sql(
+            "SELECT b FROM y WHERE a >= {low} AND a <= {high} AND b != {b} ORDER BY a",
+            {"low": 1, "high": 3, "b": "y"},
+        )
+    assert connection.execute(query, values).fetchall() == [("x",), ("z",)]
+    connection.close()
+
+
+def test_format_escapes_percent() -> None:
+    with sql_context(dialect="format"):
+        assert ("SELECT x FROM y WHERE a LIKE 'a%%' AND b = %s", [1]) == sql(
+            "SELECT x FROM y WHERE a LIKE 'a%' AND b = {b}", {"b": 1}
+        )
+
+
+def test_many_placeholders() -> None:
+    values = {f"a{index}": index for index in range(200)}
+    query = "SELECT x FROM y WHERE " + " AND ".join(f"a = {{a{index}}}" for index in range(200))
+    with sql_context(dialect="asyncpg"):
+        result, _ = sql(query, values)
+    assert result.endswith("a = $199 AND a = $200")
+
+
+def test_invalid_dialect() -> None:
+    with sql_context(dialect="unknown"):  # type: ignore[arg-type]
+        with pytest.raises(ValueError):
+            sql("SELECT x FROM y WHERE a = {a}", {"a": 1})
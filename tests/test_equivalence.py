@@ -0,0 +1,24 @@
+from sql_tstring import Template
+from sql_tstring.dialects import Parameters
+from sql_tstring.equivalence import compare, CORPUS, generate, reference
+from sql_tstring.t import Template as TTemplate
+
+
+def test_corpus() -> None:
+    report = compare(CORPUS)
+    assert report.mismatches == []
+    assert report.renders == 2 * len(CORPUS)
+
+
+def test_generated() -> None:
+    report = compare(generate(500), dialects=("sql", "asyncpg", "format", "numeric"))
+    assert report.mismatches == []
+
+
+def test_detects_mismatch() -> None:
+    def _candidate(template: Template | TTemplate) -> tuple[str, Parameters]:
+        query, values = reference(template)
+        return query.replace("?", "$"), values
+
+    report = compare(CORPUS, _candidate, dialects=("sql",))
+    assert len(report.mismatches) > 0
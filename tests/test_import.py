@@ -0,0 +1,17 @@
+import subprocess
+import sys
+
+# Modules that are slow to import and which import sql_tstring should
+# not require, they are imported when the features needing them are
+# used.
+DEFERRED = {"ast", "copy", "dataclasses", "hashlib", "inspect", "numbers", "pathlib", "pickle"}
+
+
+def test_import_budget() -> None:
+    output = subprocess.run(
+        [sys.executable, "-c", "import sys, sql_tstring; print(' '.join(sys.modules))"],
+        capture_output=True,
+        check=True,
+        text=True,
+    ).stdout
+    assert DEFERRED.isdisjoint(output.split())
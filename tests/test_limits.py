@@ -0,0 +1,76 @@
+import pytest
+
+from sql_tstring import _print_node, Predicate, sql, sql_context, t
+from sql_tstring.limits import LimitExceededError, Limits
+from sql_tstring.parser import parse
+
+
+def test_max_placeholders() -> None:
+    values = {f"a{index}": index for index in range(10)}
+    query = "SELECT x FROM y WHERE a IN (" + ", ".join(f"{{a{index}}}" for index in range(10)) + ")"
+    with sql_context(limits=Limits(max_placeholders=10)):
+        sql(query, values)
+    with sql_context(limits=Limits(max_placeholders=9)):
+        with pytest.raises(LimitExceededError) as error:
+            sql(query, values)
+    assert error.value.limit == "number of placeholders"
+    assert isinstance(error.value, ValueError)
+    assert str(error.value) == "The number of placeholders exceeds the limit of 9"
+
+
+def test_max_values() -> None:
+    with sql_context(limits=Limits(max_values=3)):
+        sql("SELECT x FROM y WHERE a = ANY({a}) AND b = {b}", {"a": [1, 2], "b": 3})
+        with pytest.raises(LimitExceededError):
+            sql("SELECT x FROM y WHERE a = ANY({a}) AND b = {b}", {"a": [1, 2, 3], "b": 4})
+
+
+def test_max_length() -> None:
+    with sql_context(limits=Limits(max_length=20)):
+        with pytest.raises(LimitExceededError):
+            sql("SELECT x FROM y WHERE a = {a}", {"a": 1})
+
+
+def test_max_length_while_printing() -> None:
+    query = "SELECT x FROM y WHERE " + " OR ".join(f"a = {{v{index}}}" for index in range(100))
+    statement = parse(t(query, {f"v{index}": index for index in range(100)}))[0]
+    placeholders: list = []
+    with pytest.raises(LimitExceededError):
+        _print_node(statement, placeholders, limits=Limits(max_length=100))
+    assert len(placeholders) < 20
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        "SELECT x FROM y WHERE a IN (SELECT a FROM z WHERE b = COALESCE({b}, 1))",
+        "SELECT x FROM y WHERE (((a = {b})))",
+    ],
+)
+def test_max_depth(query: str) -> None:
+    with sql_context(limits=Limits(max_depth=3)):
+        with pytest.raises(LimitExceededError):
+            sql(query, {"b": 1})
+
+
+def test_max_depth_deeply_nested() -> None:
+    query = "SELECT x FROM y WHERE " + "(" * 5000 + "a = {a}" + ")" * 5000
+    with sql_context(limits=Limits(max_depth=16)):
+        with pytest.raises(LimitExceededError):
+            sql(query, {"a": 1})
+
+
+def test_max_depth_nested_templates() -> None:
+    predicate = Predicate("a = {a}", {"a": 1})
+    for _ in range(5):
+        predicate = predicate & (predicate | predicate)
+    with sql_context(limits=Limits(max_depth=4)):
+        with pytest.raises(LimitExceededError):
+            sql("SELECT x FROM y WHERE {predicate}", {"predicate": predicate})
+
+    inner = t("a = {a}", {"a": 1})
+    for _ in range(5):
+        inner = t("{inner}", {"inner": inner})
+    with sql_context(limits=Limits(max_depth=4)):
+        with pytest.raises(LimitExceededError):
+            sql("SELECT x FROM y WHERE {inner}", {"inner": inner})
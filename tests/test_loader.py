@@ -0,0 +1,67 @@
+from pathlib import Path
+
+import pytest
+
+from sql_tstring import Absent, sql_context
+from sql_tstring.cache import shape_cache
+from sql_tstring.loader import load_queries
+
+USERS = """-- name: get_user
+-- Fetch a single user
+SELECT id, name
+  FROM users
+ WHERE id = {id}
+
+-- name: update_user
+UPDATE users
+   SET name = {name}
+ WHERE id = {id};
+"""
+
+ITEMS = """-- name: list_items
+SELECT id FROM items WHERE owner = {owner} AND kind = {kind}
+"""
+
+
+@pytest.fixture(name="directory")
+def _directory(tmp_path: Path) -> Path:
+    (tmp_path / "users.sql").write_text(USERS)
+    (tmp_path / "nested").mkdir()
+    (tmp_path / "nested" / "items.sql").write_text(ITEMS)
+    return tmp_path
+
+
+def test_load_queries(directory: Path) -> None:
+    queries = load_queries(directory)
+    assert sorted(queries) == ["get_user", "list_items", "update_user"]
+    assert queries.get_user.sql({"id": 1}) == ("SELECT id , name FROM users WHERE id = ?", [1])
+    assert queries["list_items"].sql({"owner": 2, "kind": Absent}) == (
+        "SELECT id FROM items WHERE owner = ?",
+        [2],
+    )
+    with sql_context(dialect="asyncpg"):
+        assert queries.update_user.sql({"name": "a", "id": 1}) == (
+            "UPDATE users SET name = $1 WHERE id = $2",
+            ["a", 1],
+        )
+
+
+def test_lazy(directory: Path) -> None:
+    shape_cache.clear()
+    queries = load_queries(directory)
+    assert queries._index is None
+    queries.get_user.sql({"id": 1})
+    assert len(shape_cache) == 1
+
+
+def test_duplicate(tmp_path: Path) -> None:
+    (tmp_path / "a.sql").write_text(ITEMS)
+    (tmp_path / "b.sql").write_text(ITEMS)
+    with pytest.raises(ValueError):
+        load_queries(tmp_path)["list_items"]
+
+
+def test_missing(tmp_path: Path) -> None:
+    queries = load_queries(tmp_path)
+    with pytest.raises(AttributeError):
+        _ = queries.missing
@@ -0,0 +1,76 @@
+from sql_tstring import Context, set_context, sql, sql_context
+from sql_tstring.cache import shape_cache
+from sql_tstring.observers import add_observer, Observer, ParseEvent, remove_observer, RenderEvent
+from sql_tstring.parser import ShapeKey
+
+
+class _Recorder(Observer):
+    def __init__(self) -> None:
+        self.calls: list[tuple[str, ShapeKey]] = []
+        self.parses: list[ParseEvent] = []
+        self.renders: list[RenderEvent] = []
+
+    def on_parse_start(self, key: ShapeKey) -> None:
+        self.calls.append(("parse_start", key))
+
+    def on_parse_end(self, event: ParseEvent) -> None:
+        self.calls.append(("parse_end", event.key))
+        self.parses.append(event)
+
+    def on_render_start(self, key: ShapeKey) -> None:
+        self.calls.append(("render_start", key))
+
+    def on_render_end(self, event: RenderEvent) -> None:
+        self.calls.append(("render_end", event.key))
+        self.renders.append(event)
+
+
+def test_context_observer() -> None:
+    shape_cache.clear()
+    recorder = _Recorder()
+    a = 1
+    with sql_context(observers=(recorder,)):
+        sql("SELECT x FROM y WHERE a = {a}", locals())
+        sql("SELECT x FROM y WHERE a = {a}", locals())
+
+    key = ("SELECT x FROM y WHERE a = ", None)
+    assert recorder.calls == [
+        ("render_start", key),
+        ("parse_start", key),
+        ("parse_end", key),
+        ("render_end", key),
+        ("render_start", key),
+        ("render_end", key),
+    ]
+    assert recorder.parses[0].statements == 1
+    assert recorder.parses[0].placeholders == 1
+    render = recorder.renders[0]
+    assert (render.query, render.values, render.arguments) == (
+        "SELECT x FROM y WHERE a = ?",
+        [1],
+        [1],
+    )
+    assert render.duration > 0
+
+
+def test_global_observer() -> None:
+    recorder = _Recorder()
+    add_observer(recorder)
+    try:
+        sql("SELECT x FROM y", {})
+    finally:
+        remove_observer(recorder)
+    sql("SELECT x FROM y", {})
+    assert len(recorder.renders) == 1
+
+
+def test_context_positional() -> None:
+    context = Context(False, {"a"}, "sql", {"tbl"})
+    assert context.tables == {"tbl"}
+    assert context.observers == ()
+    with sql_context():
+        set_context(context)
+        assert sql("SELECT {col} FROM {tbl}", {"col": "a", "tbl": "tbl"}) == (
+            "SELECT a FROM tbl",
+            [],
+        )
@@ -0,0 +1,129 @@
+from datetime import date, datetime, time, timezone
+from decimal import Decimal
+from typing import Any
+from uuid import UUID
+
+import pytest
+
+from sql_tstring import sql_context
+from sql_tstring.pagination import decode_cursor, encode_cursor, paginate
+
+
+def test_first_page() -> None:
+    with sql_context(columns={"a", "b"}):
+        assert paginate("SELECT a, b FROM y", {}, order_by=["a", "b"], limit=10) == (
+            "SELECT a , b FROM y ORDER BY a , b LIMIT ?",
+            [10],
+        )
+
+
+def test_pages() -> None:
+    with sql_context(columns={"a", "b"}):
+        first = paginate(
+            "SELECT a, b FROM y WHERE c = {c}",
+            {"c": 1},
+            order_by=["a", "b"],
+            limit=10,
+            cursor=encode_cursor([2, "x"]),
+        )
+        second = paginate(
+            "SELECT a, b FROM y WHERE c = {c}",
+            {"c": 1},
+            order_by=["a", "b"],
+            limit=10,
+            cursor=encode_cursor([5, "y"]),
+        )
+    assert first == (
+        "SELECT a , b FROM y WHERE c = ? AND (a , b) > (? , ?) ORDER BY a , b LIMIT ?",
+        [1, 2, "x", 10],
+    )
+    assert second[0] == first[0]
+    assert second[1] == [1, 5, "y", 10]
+
+
+def test_descending() -> None:
+    with sql_context(columns={"a"}):
+        assert paginate(
+            "SELECT a FROM y",
+            {},
+            order_by=["a"],
+            limit=5,
+            cursor=encode_cursor([3]),
+            descending=True,
+        ) == ("SELECT a FROM y WHERE (a) < (?) ORDER BY a DESC LIMIT ?", [3, 5])
+
+
+def test_cursor_round_trip() -> None:
+    assert decode_cursor(encode_cursor([1, "a", None, 2.5])) == [1, "a", None, 2.5]
+
+
+@pytest.mark.parametrize(
+    "value",
+    [
+        datetime(2024, 1, 2, 3, 4, 5, 6, tzinfo=timezone.utc),
+        datetime(2024, 1, 2, 3, 4, 5),
+        date(2024, 1, 2),
+        time(3, 4, 5),
+        Decimal("1.10"),
+        UUID("12345678-1234-5678-1234-567812345678"),
+        b"\x00\xff",
+    ],
+)
+def test_cursor_round_trip_typed(value: Any) -> None:
+    decoded = decode_cursor(encode_cursor([value, 1]))
+    assert decoded == [value, 1]
+    assert type(decoded[0]) is type(value)
+
+
+def test_pages_datetime() -> None:
+    created = datetime(2024, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+    with sql_context(columns={"created", "id"}):
+        assert paginate(
+            "SELECT id FROM y",
+            {},
+            order_by=["created", "id"],
+            limit=10,
+            cursor=encode_cursor([created, 3]),
+        ) == (
+            "SELECT id FROM y WHERE (created , id) > (? , ?) ORDER BY created , id LIMIT ?",
+            [created, 3, 10],
+        )
+
+
+def test_cursor_unsupported_type() -> None:
+    with pytest.raises(TypeError):
+        encode_cursor([object()])
+
+
+@pytest.mark.parametrize(
+    "cursor",
+    [
+        "!!!",
+        encode_cursor([1])[:-2],
+        "eyJhIjoxfQ",
+        encode_cursor([{"a": 1}]),
+        encode_cursor([{"t": "date", "v": 1}]),
+        encode_cursor([{"t": "date", "v": "x"}]),
+    ],
+)
+def test_invalid_cursor(cursor: str) -> None:
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+@pytest.mark.parametrize(
+    "query, order_by, cursor",
+    [
+        ("SELECT a FROM y", ["z"], None),
+        ("SELECT a FROM y ORDER BY a", ["a"], None),
+        ("SELECT a FROM y LIMIT 1", ["a"], None),
+        ("SELECT a FROM y FOR UPDATE", ["a"], None),
+        ("SELECT a FROM y GROUP BY a", ["a"], None),
+        ("SELECT a FROM y WHERE a = 1 OR a = 2", ["a"], None),
+        ("SELECT a FROM y", ["a"], encode_cursor([1, 2])),
+    ],
+)
+def test_invalid(query: str, order_by: list[str], cursor: str | None) -> None:
+    with sql_context(columns={"a"}):
+        with pytest.raises(ValueError):
+            paginate(query, {}, order_by=order_by, limit=1, cursor=cursor)
@@ -1,8 +1,10 @@
+from enum import Enum
 from typing import Any
 
 import pytest
 
 from sql_tstring import LiteralValue, RewritingValue, sql, sql_context, t
+from sql_tstring.adapters import Adapters
 
 TZ = "uk"
 
@@ -214,3 +216,67 @@ def test_nested() -> None:
     query, values = sql("SELECT x FROM y WHERE {inner}", locals())
     assert query == "SELECT x FROM y WHERE x = ?"
     assert values == ["a"]
+
+
+def test_composite_in() -> None:
+    rows = [(1, "x"), (2, "y"), (3, "z")]
+    query = "SELECT x FROM y WHERE (a, b) IN {rows} AND c = {c}"
+    with sql_context(columns={"a", "b"}):
+        assert sql(query, {"rows": rows, "c": 4}) == (
+            "SELECT x FROM y WHERE (a , b) IN (VALUES (? , ?) , (? , ?) , (? , ?) , (? , ?)) "
+            "AND c = ?",
+            [1, "x", 2, "y", 3, "z", 3, "z", 4],
+        )
+        with sql_context(dialect="asyncpg"):
+            assert sql(query, {"rows": rows, "c": 4}) == (
+                "SELECT x FROM y WHERE (a , b) IN "
+                "(SELECT * FROM unnest(CAST($1 AS int8[]) , CAST($2 AS text[]))) AND c = $3",
+                [[1, 2, 3], ["x", "y", "z"], 4],
+            )
+
+
+class Colour(Enum):
+    RED = "red"
+    BLUE = "blue"
+
+
+def test_composite_in_adapted() -> None:
+    rows = [(1, Colour.RED), (2, Colour.BLUE)]
+    query = "SELECT x FROM y WHERE (a, b) IN {rows}"
+    with sql_context(columns={"a", "b"}, adapters=Adapters({Enum: lambda member: member.value})):
+        assert sql(query, {"rows": rows}) == (
+            "SELECT x FROM y WHERE (a , b) IN (VALUES (? , ?) , (? , ?))",
+            [1, "red", 2, "blue"],
+        )
+        with sql_context(dialect="asyncpg"):
+            assert sql(query, {"rows": rows}) == (
+                "SELECT x FROM y WHERE (a , b) IN "
+                "(SELECT * FROM unnest(CAST($1 AS int8[]) , CAST($2 AS text[])))",
+                [[1, 2], ["red", "blue"]],
+            )
+
+
+def test_composite_in_absent() -> None:
+    query = "SELECT x FROM y WHERE (a, b) NOT IN {rows}"
+    with sql_context(columns={"a", "b"}):
+        assert sql(query, {"rows": RewritingValue.ABSENT}) == ("SELECT x FROM y", [])
+
+
+@pytest.mark.parametrize(
+    "columns, rows",
+    [
+        (set(), [(1, 2)]),
+        ({"a", "b"}, []),
+        ({"a", "b"}, [(1, 2, 3)]),
+    ],
+)
+def test_composite_in_invalid(columns: set[str], rows: list) -> None:
+    with sql_context(columns=columns):
+        with pytest.raises(ValueError):
+            sql("SELECT x FROM y WHERE (a, b) IN {rows}", {"rows": rows})
+
+
+def test_composite_in_array_types() -> None:
+    with sql_context(columns={"a", "b"}, dialect="asyncpg"):
+        with pytest.raises(ValueError):
+            sql("SELECT x FROM y WHERE (a, b) IN {rows}", {"rows": [(1, 2), ("x", 3)]})
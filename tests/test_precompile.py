@@ -0,0 +1,130 @@
+import gc
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+from sql_tstring import sql, t
+from sql_tstring.__main__ import main
+from sql_tstring.cache import ShapeCache
+from sql_tstring.dialects import get_dialect, QMARK
+from sql_tstring.parser import ShapeKey, template_key
+from sql_tstring.precompile import load_manifest, scan, warm
+from sql_tstring.t import Template
+
+SOURCE = """
+from sql_tstring import sql
+
+def get(a):
+    return sql("SELECT x FROM y WHERE a = {a}", locals())
+
+def broken(a):
+    return sql("SELECT x FROM y; {a}", locals())
+
+def dynamic(query):
+    return sql(query, {})
+"""
+
+
+def test_scan(tmp_path: Path) -> None:
+    (tmp_path / "queries.py").write_text(SOURCE)
+    found = scan([tmp_path])
+    assert [(query.line, query.error is None) for query in found] == [(5, True), (8, False)]
+    assert found[0].key == ("SELECT x FROM y WHERE a = ", None)
+
+
+TEMPLATE_SOURCE = """
+from sql_tstring import sql
+
+def get(a):
+    return sql(t"SELECT x FROM y WHERE a = {a}")
+
+def nested(a):
+    return sql(t"SELECT x FROM y WHERE {t"a = {a}"}")
+
+def cte(cte):
+    return sql(t"{cte} SELECT x FROM y")
+
+def broken():
+    return sql(t"SELECT x FROM {t"y)"}")
+"""
+
+
+@pytest.mark.skipif(sys.version_info < (3, 14), reason="Requires t-strings")
+def test_scan_template_strings(tmp_path: Path) -> None:
+    (tmp_path / "queries.py").write_text(TEMPLATE_SOURCE)
+    found = scan([tmp_path])
+    assert [(query.line, query.error is None) for query in found] == [
+        (5, True),
+        (8, True),
+        (14, False),
+    ]
+    # Evaluated so that this module compiles before t-strings
+    expected = eval('t"SELECT x FROM y WHERE {t"a = {a}"}"', {"a": 1})
+    assert found[1].key == template_key(expected)[0]
+
+
+def test_manifest(tmp_path: Path) -> None:
+    (tmp_path / "queries.py").write_text(SOURCE)
+    manifest = tmp_path / "manifest.json"
+    assert main(["precompile", str(tmp_path), "--output", str(manifest)]) == 1
+
+    cache = ShapeCache()
+    assert load_manifest(manifest, cache) == 1
+    assert ("SELECT x FROM y WHERE a = ", None) in cache
+
+
+def test_warm() -> None:
+    cache = ShapeCache()
+    queries: list[Template | ShapeKey] = [
+        t("SELECT x FROM y WHERE a = {a}", {"a": 1}),
+        ("SELECT x FROM y WHERE a = ", None),
+        t("SELECT {col} FROM y", {"col": "x"}),
+    ]
+    assert warm(queries, dialects=["sql", get_dialect("asyncpg")], cache=cache, freeze=False) == 2
+    unwarmed = ShapeCache()
+    assert warm(queries, dialects=[], cache=unwarmed, freeze=False) == 2
+    assert cache.info().bytes > unwarmed.info().bytes
+    plain = cache.get(("SELECT x FROM y WHERE a = ", None))
+    assert plain.variants[QMARK].text == "SELECT x FROM y WHERE a = ?"
+    assert plain.variants[get_dialect("asyncpg")].text == "SELECT x FROM y WHERE a = $1"
+    assert cache.get(("SELECT ", None, " FROM y")).variants == {}
+
+
+def _uss() -> int:
+    with open("/proc/self/smaps_rollup") as file_:
+        return sum(
+            int(line.split()[1])
+            for line in file_
+            if line.startswith(("Private_Clean:", "Private_Dirty:"))
+        )
+
+
+def _child_growth(queries: list[str]) -> int:
+    read, write = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        start = _uss()
+        for query in queries:
+            sql(query, {"a": 1, "b": 2})
+        os.write(write, str(_uss() - start).encode())
+        os._exit(0)
+    os.close(write)
+    with os.fdopen(read) as file_:
+        growth = int(file_.read())
+    os.waitpid(pid, 0)
+    return growth
+
+
+@pytest.mark.skipif(not Path("/proc/self/smaps_rollup").exists(), reason="Requires Linux")
+def test_warm_fork_uss() -> None:
+    # Children rendering warmed queries should grow their unique set
+    # size by less than children that must parse the queries.
+    warmed = [f"SELECT x FROM y WHERE a{index} = {{a}} AND b = {{b}}" for index in range(1000)]
+    cold = [f"SELECT x FROM z WHERE a{index} = {{a}} AND b = {{b}}" for index in range(1000)]
+    warm([t(query, {"a": 1, "b": 2}) for query in warmed])
+    try:
+        assert _child_growth(warmed) < _child_growth(cold) * 0.75
+    finally:
+        gc.unfreeze()
@@ -0,0 +1,90 @@
+from typing import cast
+
+import pytest
+
+from sql_tstring import Absent, Predicate, sql, t
+from sql_tstring.cache import cache_info
+from sql_tstring.parser import PredicateKey, template_key
+from sql_tstring.stats import describe
+
+
+def predicate_key(predicate: Predicate) -> PredicateKey:
+    key, _ = template_key(t("{predicate}", locals()))
+    return cast(PredicateKey, key[0])
+
+
+def test_predicate() -> None:
+    a = 1
+    predicate = Predicate(t("a = {a}", locals()))
+    assert sql("SELECT x FROM y WHERE {predicate}", locals()) == (
+        "SELECT x FROM y WHERE (a = ?)",
+        [1],
+    )
+
+
+def test_combined() -> None:
+    predicate = (
+        Predicate("a = {a}", {"a": 1})
+        & (Predicate("b = {b}", {"b": 2}) | Predicate("c = {c}", {"c": 3}))
+        & Predicate("d = {d}", {"d": 4})
+    )
+    assert sql("SELECT x FROM y WHERE z = {z} AND {predicate}", locals() | {"z": 0}) == (
+        "SELECT x FROM y WHERE z = ? AND (a = ? AND (b = ? OR c = ?) AND d = ?)",
+        [0, 1, 2, 3, 4],
+    )
+
+
+def test_multiple_expressions() -> None:
+    predicate = Predicate("a = {a} OR b = {b}", {"a": 1, "b": 2}) & Predicate("c = {c}", {"c": 3})
+    assert sql("SELECT x FROM y WHERE {predicate}", locals()) == (
+        "SELECT x FROM y WHERE ((a = ? OR b = ?) AND c = ?)",
+        [1, 2, 3],
+    )
+
+
+def test_having() -> None:
+    predicate = Predicate("COUNT(a) > {a}", {"a": 1}) | Predicate("b = {b}", {"b": 2})
+    assert sql("SELECT x FROM y GROUP BY x HAVING {predicate}", locals()) == (
+        "SELECT x FROM y GROUP BY x HAVING (COUNT(a) > ? OR b = ?)",
+        [1, 2],
+    )
+
+
+def test_absent() -> None:
+    predicate = Predicate("a = {a}", {"a": Absent}) & Predicate("b = {b}", {"b": 2})
+    assert sql("SELECT x FROM y WHERE {predicate}", locals()) == (
+        "SELECT x FROM y WHERE (b = ?)",
+        [2],
+    )
+    predicate = Predicate("a = {a}", {"a": Absent})
+    assert sql("SELECT x FROM y WHERE {predicate}", locals()) == ("SELECT x FROM y", [])
+
+
+def _fragment_entries() -> int:
+    return next(info.entries for info in cache_info() if info.name == "fragments")
+
+
+def test_fragments_parsed_once() -> None:
+    entries = _fragment_entries()
+    a = Predicate("fragment_a = {a}", {"a": 1})
+    b = Predicate("fragment_b = {b}", {"b": 2})
+    for predicate in (a, b, a & b, b | a, a & b & a):
+        sql("SELECT x FROM y WHERE {predicate}", {"predicate": predicate})
+    assert _fragment_entries() == entries + 2
+
+
+def test_key() -> None:
+    predicate = Predicate("a = {a}", {"a": 1}) & Predicate("b = {b}", {"b": 2})
+    assert describe(("SELECT x FROM y WHERE ", predicate_key(predicate))) == (
+        "SELECT x FROM y WHERE (a = {} AND b = {})"
+    )
+
+
+@pytest.mark.parametrize(
+    "query",
+    ["SELECT x FROM y ORDER BY {predicate}", "UPDATE y SET {predicate}"],
+)
+def test_invalid_clause(query: str) -> None:
+    predicate = Predicate("a = {a}", {"a": 1})
+    with pytest.raises(ValueError):
+        sql(query, locals())
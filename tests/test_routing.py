@@ -0,0 +1,71 @@
+import pytest
+
+from sql_tstring import Absent, QueryKind, render
+from sql_tstring.parser import parse_shape
+
+
+@pytest.mark.parametrize(
+    "query, expected",
+    [
+        ("SELECT x FROM y WHERE a = {a}", QueryKind.READ),
+        ("SELECT x FROM y WHERE a = {a} FOR UPDATE", QueryKind.LOCKING_READ),
+        ("INSERT INTO y (a) VALUES ({a}) RETURNING x", QueryKind.WRITE),
+        ("UPDATE y SET a = {a}", QueryKind.WRITE),
+        ("DELETE FROM y WHERE a = {a}", QueryKind.WRITE),
+        (
+            "INSERT INTO y (a) VALUES ({a}) ON CONFLICT (a) DO UPDATE SET a = {a}",
+            QueryKind.WRITE,
+        ),
+        (
+            "WITH d AS (DELETE FROM y WHERE a = {a} RETURNING x) SELECT x FROM d",
+            QueryKind.WRITE,
+        ),
+        ("SELECT x FROM y WHERE a IN (SELECT a FROM z WHERE b = {a})", QueryKind.READ),
+        ("SELECT x FROM y; UPDATE y SET a = {a}", QueryKind.WRITE),
+    ],
+)
+def test_kind(query: str, expected: QueryKind) -> None:
+    assert render(query, {"a": 1}).kind == expected
+
+
+def test_absent_lock() -> None:
+    rendered = render("SELECT x FROM y FOR UPDATE {lock}", {"lock": Absent})
+    assert (rendered.query, rendered.values, rendered.kind) == (
+        "SELECT x FROM y",
+        [],
+        QueryKind.READ,
+    )
+    assert render("SELECT x FROM y FOR UPDATE {lock}", {"lock": "NOWAIT"}).kind == (
+        QueryKind.LOCKING_READ
+    )
+
+
+@pytest.mark.parametrize(
+    "query, expected",
+    [
+        ("SELECT x FROM y WHERE tenant_id = {a} AND b = {b}", [1]),
+        ("SELECT x FROM y WHERE b = {b} AND {a} = tenant_id", [1]),
+        ("SELECT x FROM y WHERE y.tenant_id = {a}", [1]),
+        ("SELECT x FROM y WHERE tenant_id IN ({a}, {b})", [1, 2]),
+        ("SELECT x FROM y WHERE tenant_id IN {c}", [1, 3]),
+        ("SELECT x FROM y WHERE tenant_id = ANY({c})", [1, 3]),
+        ("SELECT x FROM y WHERE tenant_id = ANY({c}) AND tenant_id = {a}", [1]),
+        ("SELECT x FROM y WHERE tenant_id = {a} OR b = {b}", None),
+        ("SELECT x FROM y WHERE tenant_id > {a}", None),
+        ("SELECT x FROM y WHERE b = {b}", None),
+        ("SELECT x FROM y WHERE tenant_id = {absent} AND b = {b}", None),
+        ("UPDATE y SET tenant_id = {b} WHERE tenant_id = {a}", [1]),
+    ],
+)
+def test_shard_values(query: str, expected: list | None) -> None:
+    values = {"a": 1, "b": 2, "c": [1, 3], "absent": Absent}
+    assert render(query, values, shard_column="tenant_id").shard_values == expected
+
+
+def test_shard_predicates_parsed() -> None:
+    # Found whilst parsing, so that rendering doesn't change the cached shape
+    shape = parse_shape(("SELECT x FROM y WHERE t.TENANT_ID = ", None, " AND b IN ", None))
+    assert shape.shard_predicates == {"tenant_id": [[(0, False)]], "b": [[(1, True)]]}
+    assert render(
+        "SELECT x FROM y WHERE t.TENANT_ID = {a}", {"a": 1}, shard_column="Tenant_Id"
+    ).shard_values == [1]
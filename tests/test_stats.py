@@ -0,0 +1,47 @@
+from typing import Iterator
+
+import pytest
+
+from sql_tstring import observers, sql, stats
+
+
+@pytest.fixture(name="registry")
+def _registry() -> Iterator[stats.StatsRegistry]:
+    registry = stats.enable_stats(samples=10)
+    yield registry
+    stats.disable_stats()
+
+
+def test_stats(registry: stats.StatsRegistry) -> None:
+    for index in range(20):
+        sql("SELECT x FROM y WHERE a = {a}", {"a": index})
+    sql("SELECT x FROM y WHERE a = {a} AND b = {a}", {"a": 1})
+
+    snapshot = registry.snapshot(order_by="renders")
+    assert [(shape.query, shape.renders) for shape in snapshot] == [
+        ("SELECT x FROM y WHERE a = {}", 20),
+        ("SELECT x FROM y WHERE a = {} AND b = {}", 1),
+    ]
+    assert snapshot[0].mean_values == 1
+    assert snapshot[0].mean_length == len("SELECT x FROM y WHERE a = ?")
+    assert 0 < snapshot[0].p99_time <= snapshot[0].total_time
+
+
+def test_stats_top(registry: stats.StatsRegistry) -> None:
+    sql("SELECT x FROM y", {})
+    sql("SELECT x FROM z", {})
+    assert len(registry.snapshot(top=1)) == 1
+
+
+def test_stats_disabled() -> None:
+    assert not any(
+        isinstance(observer, stats.StatsRegistry) for observer in observers.global_observers
+    )
+    sql("SELECT x FROM y", {})
+    assert stats.registry is None
+
+    registry = stats.enable_stats()
+    stats.disable_stats()
+    assert registry not in observers.global_observers
+    sql("SELECT x FROM y", {})
+    assert registry.snapshot() == []
@@ -0,0 +1,55 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from sql_tstring import Absent, sql, sql_context
+from sql_tstring.cache import shape_cache, ShapeCache
+from sql_tstring.dialects import Parameters
+from sql_tstring.parser import template_key
+from sql_tstring.t import t
+
+
+def _render(index: int) -> tuple[str, Parameters]:
+    a = index
+    b = Absent if index % 2 == 0 else index
+    c = "x" if index % 3 == 0 else "y"
+    with sql_context(columns={"x", "y"}):
+        return sql(
+            f"SELECT x FROM y{index % 7} WHERE a = {{a}} AND b = {{b}} ORDER BY {{c}}", locals()
+        )
+
+
+def test_concurrent_renders() -> None:
+    shape_cache.clear()
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(_render, range(2000)))
+
+    for index, result in enumerate(results):
+        assert result == _render(index)
+
+
+def test_concurrent_eviction() -> None:
+    cache = ShapeCache(maxsize=4)
+    keys = [template_key(t(f"SELECT x FROM y{index}", {}))[0] for index in range(32)]
+
+    def _get(index: int) -> None:
+        cache.get(keys[index % len(keys)])
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(_get, range(5000)))
+    # Concurrent misses can each add before seeing the others
+    assert len(cache) <= 4 + 8
+
+
+def test_concurrent_resize() -> None:
+    # Entries resized whilst being evicted by other threads
+    cache = ShapeCache(maxsize=4)
+    keys = [template_key(t(f"SELECT x FROM y{index}", {}))[0] for index in range(32)]
+
+    def _resize(index: int) -> None:
+        key = keys[index % len(keys)]
+        shape = cache.get(key)
+        cache.resize(key, shape, 8)
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(_resize, range(5000)))
+    assert len(cache) <= 4 + 8
+    assert cache.info().bytes > 0